@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(value):
+    """Normalize inputs so trivially different prompts share a cache entry"""
+    if isinstance(value, str):
+        return ' '.join(value.lower().split())
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    return value
+
+
+class Flight:
+    """One in-process computation that concurrent identical requests wait on"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AIResultCache:
+    """Content-addressed cache for AIService model results.
+
+    Entries are keyed by a hash of the method name, normalized inputs,
+    model and prompt version, and stored in the shared Redis cache (``ai``
+    alias) with a TTL. Redis evicts them LRU under ``volatile-lru``. When
+    Redis is unreachable the in-process LRU cache (``ai_local`` alias) is
+    used instead for ``AI_CACHE_REDIS_RETRY_SECONDS``.
+    """
+    STATS_KEYS = ('hits', 'misses', 'coalesced')
+    STATS_FLUSH_INTERVAL = 1.0
+    POLL_INTERVAL = 0.05
+    redis_down_until = 0
+    pending_stats = Counter()
+    stats_lock = threading.Lock()
+    stats_flushed_at = time.monotonic()
+    flights = {}
+    flights_lock = threading.Lock()
+
+    def __init__(self):
+        self.shared = caches['ai']
+        self.local = caches['ai_local']
+
+    @staticmethod
+    def make_key(method, inputs, model, prompt_version):
+        payload = json.dumps([method, normalize(inputs), model, prompt_version], sort_keys=True, default=str)
+        return f'ai:{method}:{hashlib.sha256(payload.encode()).hexdigest()}'
+
+    def backend(self):
+        if time.monotonic() < AIResultCache.redis_down_until:
+            return self.local
+        return self.shared
+
+    def call(self, operation, *args):
+        backend = self.backend()
+        try:
+            return getattr(backend, operation)(*args)
+        except RedisError as e:
+            self.redis_failed(e)
+            return getattr(self.local, operation)(*args)
+
+    @staticmethod
+    def redis_failed(error):
+        logger.warning('AI cache falling back to local memory: %s', error)
+        AIResultCache.redis_down_until = time.monotonic() + settings.AI_CACHE_REDIS_RETRY_SECONDS
+
+    def incr_many(self, amounts):
+        """Add ``amounts`` (key -> int) to counters, creating missing ones.
+
+        On Redis this is one pipelined ``INCRBY`` per key, a single round
+        trip however many counters changed.
+        """
+        if not amounts:
+            return
+        backend = self.backend()
+        if isinstance(backend, RedisCache):
+            try:
+                pipeline = backend._cache.get_client(write=True).pipeline(transaction=False)
+                for key, amount in amounts.items():
+                    pipeline.incrby(backend.make_and_validate_key(key), amount)
+                pipeline.execute()
+                return
+            except RedisError as e:
+                self.redis_failed(e)
+            backend = self.local
+        for key, amount in amounts.items():
+            try:
+                backend.incr(key, amount)
+            except ValueError:  # first increment of this key
+                if not backend.add(key, amount, None):
+                    backend.incr(key, amount)
+
+    def count(self, stat):
+        """Count a hit, miss or coalesced wait in process; totals reach Redis every ``STATS_FLUSH_INTERVAL``"""
+        with AIResultCache.stats_lock:
+            AIResultCache.pending_stats[f'ai:stats:{stat}'] += 1
+            if time.monotonic() - AIResultCache.stats_flushed_at < self.STATS_FLUSH_INTERVAL:
+                return
+        self.flush_stats()
+
+    def flush_stats(self):
+        with AIResultCache.stats_lock:
+            pending, AIResultCache.pending_stats = AIResultCache.pending_stats, Counter()
+            AIResultCache.stats_flushed_at = time.monotonic()
+        self.incr_many(pending)
+
+    def lookup(self, method, inputs, model, prompt_version):
+        """Return the cached result or None, counting the hit or miss"""
+        result = self.call('get', self.make_key(method, inputs, model, prompt_version))
+        self.count('hits' if result is not None else 'misses')
+        return result
+
+    def store(self, method, inputs, model, prompt_version, result, ttl=None):
+        self.store_result(self.make_key(method, inputs, model, prompt_version), result, ttl)
+
+    def get_or_compute(self, method, inputs, compute, model, prompt_version, ttl=None):
+        """Return the cached result for these inputs, computing and storing it on a miss.
+
+        Concurrent misses for the same key share one ``compute`` call: within
+        the process, threads wait on the first one's ``Flight``, and across
+        workers a short Redis lock elects one worker while the others poll
+        for its result. ``compute`` is expected to raise on failure so error
+        fallbacks are never cached.
+        """
+        result = self.lookup(method, inputs, model, prompt_version)
+        if result is not None:
+            return result
+        
+        key = self.make_key(method, inputs, model, prompt_version)
+        wait = settings.AI_LATENCY_BUDGETS.get(method, settings.AI_DEFAULT_TIMEOUT)
+        with AIResultCache.flights_lock:
+            flight = AIResultCache.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = AIResultCache.flights[key] = Flight()
+        
+        if not leader:
+            self.count('coalesced')
+            if not flight.done.wait(wait):
+                return compute()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            flight.result = self.compute_once(key, compute, wait, ttl)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with AIResultCache.flights_lock:
+                AIResultCache.flights.pop(key, None)
+            flight.done.set()
+    
+    def compute_once(self, key, compute, wait, ttl=None):
+        """Compute and store ``key`` unless another worker holding its lock stores it first"""
+        lock_key = f'{key}:lock'
+        if not self.call('add', lock_key, 1, int(wait) + 1):
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline:
+                time.sleep(self.POLL_INTERVAL)
+                found = self.call('get_many', [key, lock_key])
+                if key in found:
+                    self.count('coalesced')
+                    return found[key]
+                if lock_key not in found:
+                    break  # the other worker failed without storing a result
+            return self.store_result(key, compute(), ttl)
+        
+        try:
+            return self.store_result(key, compute(), ttl)
+        finally:
+            self.call('delete', lock_key)
+    
+    def store_result(self, key, result, ttl=None):
+        self.call('set', key, result, ttl or settings.AI_CACHE_TTL)
+        return result
+    
+    def stats(self):
+        self.flush_stats()
+        hits, misses, coalesced = (self.call('get', f'ai:stats:{stat}') or 0 for stat in self.STATS_KEYS)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'coalesced': coalesced,
+            'hit_rate': round(hits / total * 100, 2) if total else 0,
+        }
@@ -0,0 +1,171 @@
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from pymongo import UpdateOne
+
+from .models import CategoryModel
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+CATEGORY_PATTERN = re.compile(r'^\w+$')  # safe to use in a field path
+FEATURE_BUCKETS = 2 ** 18
+# The categories tasks are classified into; only these are learned, which
+# bounds every model at one document (or shard set) per category
+CATEGORIES = ('personal', 'work', 'health', 'shopping', 'finance', 'education', 'travel', 'home')
+# Key in Task.ai_metadata naming the category a task was learned under
+LEARNED_KEY = 'learned_category'
+
+
+def learned_example(title, description, ai_metadata):
+    """The example a task was learned as, or None if it never trained the classifier"""
+    category = (ai_metadata or {}).get(LEARNED_KEY)
+    return (title, description, category) if category else None
+
+
+def learned_examples(rows):
+    """``learned_example`` of each raw task row that has one"""
+    examples = (learned_example(row.get('title'), row.get('description'), row.get('ai_metadata')) for row in rows)
+    return [example for example in examples if example]
+
+
+def features(title, description=''):
+    """Hashed unigram and bigram features of a task's text"""
+    tokens = TOKEN_PATTERN.findall(f'{title} {description or ""}'.lower())
+    grams = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+    return Counter(f'f{zlib.crc32(gram.encode()) % FEATURE_BUCKETS}' for gram in grams)
+
+
+class CategoryClassifier:
+    """Multinomial naive Bayes over hashed token features.
+
+    Each user's own categorized tasks are combined with a global prior
+    trained on everyone's tasks, weighted by ``AI_CLASSIFIER_PRIOR_WEIGHT``.
+    Loaded models are kept in process for ``MODEL_TTL`` seconds so a
+    prediction is a few dictionary lookups, and this process's own updates
+    are applied to them in place rather than forcing a reload.
+    """
+    MODEL_TTL = 60
+    MAX_CACHED_MODELS = 1000
+    _models = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, categories):
+        self.categories = categories
+
+    @classmethod
+    def load(cls, user_id):
+        with cls._lock:
+            cached = cls._models.get(user_id)
+            if cached and cached[0] > time.monotonic():
+                cls._models.move_to_end(user_id)
+                return cached[1]
+        model = {
+            'document_count': 0, 'class_counts': {}, 'token_counts': {}, 'feature_counts': {},
+            'feature_totals': Counter(), 'vocabulary': 0,
+        }
+        for shard in CategoryModel._get_collection().find({'user': user_id}):
+            category = shard['category']
+            cls._add(model, category, shard.get('document_count', 0), shard.get('token_count', 0), shard.get('feature_counts', {}))
+        with cls._lock:
+            cls._models[user_id] = (time.monotonic() + cls.MODEL_TTL, model)
+            cls._models.move_to_end(user_id)
+            while len(cls._models) > cls.MAX_CACHED_MODELS:
+                cls._models.popitem(last=False)
+        return model
+
+    @staticmethod
+    def _add(model, category, document_count, token_count, feature_counts):
+        """Add counts for ``category`` to a loaded model, keeping its vocabulary size current"""
+        model['document_count'] += document_count
+        model['class_counts'][category] = model['class_counts'].get(category, 0) + document_count
+        model['token_counts'][category] = model['token_counts'].get(category, 0) + token_count
+        category_features = model['feature_counts'].setdefault(category, {})
+        totals = model['feature_totals']
+        for feature, count in feature_counts.items():
+            category_features[feature] = category_features.get(feature, 0) + count
+            totals[feature] += count
+            if totals[feature] <= 0:
+                del totals[feature]
+        model['vocabulary'] = len(totals)
+
+    @classmethod
+    def learn(cls, user, examples=(), forget=()):
+        """Add ``examples`` and remove ``forget``, both ``(title, description, category)`` triples.
+
+        All changes to a category are folded into one ``$inc`` of the
+        user's shard and one of a random global prior shard, sent in a
+        single bulk write. Examples outside ``CATEGORIES`` are ignored.
+        """
+        deltas = {}
+        for (title, description, category), weight in [*((example, 1) for example in examples),
+                                                       *((example, -1) for example in forget)]:
+            if category not in CATEGORIES:
+                continue
+            counts = features(title, description)
+            delta = deltas.setdefault(category, [0, 0, Counter()])
+            delta[0] += weight
+            delta[1] += weight * sum(counts.values())
+            for feature, count in counts.items():
+                delta[2][feature] += weight * count
+        deltas = {category: delta for category, delta in deltas.items() if delta[0] or delta[1] or any(delta[2].values())}
+        if not deltas:
+            return
+
+        now = datetime.utcnow()
+        requests = []
+        for category, (document_count, token_count, feature_counts) in deltas.items():
+            increments = {'document_count': document_count, 'token_count': token_count}
+            increments.update({f'feature_counts.{feature}': count for feature, count in feature_counts.items() if count})
+            update = {'$inc': increments, '$set': {'updated_at': now}}
+            prior_shard = random.randrange(settings.AI_CLASSIFIER_PRIOR_SHARDS)
+            requests.append(UpdateOne({'user': user.pk, 'category': category, 'shard': 0}, update, upsert=True))
+            requests.append(UpdateOne({'user': None, 'category': category, 'shard': prior_shard}, update, upsert=True))
+        CategoryModel._get_collection().bulk_write(requests, ordered=False)
+
+        with cls._lock:
+            for user_id in (user.pk, None):
+                cached = cls._models.get(user_id)
+                if cached:
+                    for category, delta in deltas.items():
+                        cls._add(cached[1], category, *delta)
+
+    def predict(self, user, title, description=''):
+        """Return ``(category, probability)``, or ``(None, 0)`` without enough history"""
+        user_model = self.load(user.pk)
+        global_model = self.load(None)
+        prior_weight = settings.AI_CLASSIFIER_PRIOR_WEIGHT
+        document_count = user_model.get('document_count', 0) + prior_weight * global_model.get('document_count', 0)
+        if document_count < settings.AI_CLASSIFIER_MIN_DOCUMENTS:
+            return None, 0
+
+        counts = features(title, description)
+        vocabulary = max(user_model['vocabulary'], global_model['vocabulary'], 1)
+        scores = {}
+        for category in self.categories:
+            class_count = (user_model.get('class_counts', {}).get(category, 0)
+                           + prior_weight * global_model.get('class_counts', {}).get(category, 0))
+            if class_count <= 0:
+                continue
+            user_features = user_model.get('feature_counts', {}).get(category, {})
+            global_features = global_model.get('feature_counts', {}).get(category, {})
+            token_count = (user_model.get('token_counts', {}).get(category, 0)
+                           + prior_weight * global_model.get('token_counts', {}).get(category, 0))
+            denominator = math.log(token_count + vocabulary)
+
+            score = math.log(class_count / document_count)
+            for feature, count in counts.items():
+                feature_count = user_features.get(feature, 0) + prior_weight * global_features.get(feature, 0)
+                score += count * (math.log(feature_count + 1) - denominator)
+            scores[category] = score
+
+        if not scores:
+            return None, 0
+        best = max(scores, key=scores.get)
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1 / total
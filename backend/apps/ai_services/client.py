@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+import httpx
+import openai
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: the request may succeed on another attempt
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+_client = None
+_client_lock = threading.Lock()
+_async_client = None
+_loop = None
+_loop_pid = None
+
+
+def get_client():
+    """Return the process-wide OpenAI client.
+
+    One keep-alive connection pool is shared by every request in the
+    process, so views no longer pay for a new pool and TLS handshake per
+    call. Retries are handled by ``call_with_retries`` instead of the SDK.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = openai.OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_BASE_URL,
+                    max_retries=0,
+                    http_client=httpx.Client(
+                        limits=_http_limits(),
+                        timeout=httpx.Timeout(settings.AI_DEFAULT_TIMEOUT, connect=2.0),
+                    ),
+                )
+    return _client
+
+
+def _http_limits():
+    return httpx.Limits(
+        max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=30,
+    )
+
+
+def run_async(coro):
+    """Run ``coro`` on the process-wide AI event loop and return its result.
+
+    The loop lives in a daemon thread for the life of the process, so the
+    async client bound to it keeps its connection pool between calls. A
+    forked worker starts its own loop instead of inheriting a dead thread.
+    """
+    global _loop, _loop_pid, _async_client
+    with _client_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            _async_client = None
+            threading.Thread(target=_loop.run_forever, name='ai-event-loop', daemon=True).start()
+        loop = _loop
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def get_async_client():
+    """Return the async OpenAI client of the AI event loop; only call from coroutines given to ``run_async``"""
+    global _async_client
+    if _async_client is None:
+        _async_client = openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=_http_limits(),
+                timeout=httpx.Timeout(settings.AI_DEFAULT_TIMEOUT, connect=2.0),
+            ),
+        )
+    return _async_client
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds. One trial call is then
+    let through (half-open): success closes the circuit, failure opens it
+    again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning('AI provider circuit opened after %s failures', self.failures)
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that says nothing about the provider's health, freeing the half-open trial"""
+        with self.lock:
+            self.trial_in_flight = False
+
+
+breaker = CircuitBreaker(
+    failure_threshold=settings.AI_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.AI_CIRCUIT_RESET_TIMEOUT,
+)
+
+
+def _backoff(attempt, deadline):
+    """Full-jitter delay before retrying after failed ``attempt`` (from 0), or None when out of retries or budget"""
+    backoff = random.uniform(0, settings.AI_RETRY_BASE_DELAY * 2 ** attempt)
+    if attempt >= settings.AI_MAX_RETRIES or time.monotonic() + backoff >= deadline:
+        return None
+    return backoff
+
+
+def call_with_retries(method, request):
+    """Run ``request(timeout)`` within the method's latency budget.
+
+    Retryable errors are retried with full-jitter exponential backoff as
+    long as the budget allows. Every failed attempt counts against the
+    circuit breaker, and while it is open ``CircuitOpenError`` is raised
+    without calling the provider so callers fall back to their defaults.
+    """
+    deadline = time.monotonic() + settings.AI_LATENCY_BUDGETS.get(method, settings.AI_DEFAULT_TIMEOUT)
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError('AI provider circuit is open')
+        try:
+            response = request(deadline - time.monotonic())
+        except RETRYABLE_ERRORS:
+            breaker.record_failure()
+            backoff = _backoff(attempt, deadline)
+            if backoff is None:
+                raise
+            attempt += 1
+            time.sleep(backoff)
+            continue
+        except openai.APIError:
+            # The provider answered (e.g. a 400), so it is healthy
+            breaker.record_success()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return response
+
+
+async def acall_with_retries(method, request):
+    """Async ``call_with_retries``: awaits ``request(timeout)`` under the same budget, retries and breaker"""
+    deadline = time.monotonic() + settings.AI_LATENCY_BUDGETS.get(method, settings.AI_DEFAULT_TIMEOUT)
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError('AI provider circuit is open')
+        try:
+            response = await request(deadline - time.monotonic())
+        except RETRYABLE_ERRORS:
+            breaker.record_failure()
+            backoff = _backoff(attempt, deadline)
+            if backoff is None:
+                raise
+            attempt += 1
+            await asyncio.sleep(backoff)
+            continue
+        except openai.APIError:
+            breaker.record_success()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return response
@@ -0,0 +1,181 @@
+"""A local stand-in for the OpenAI chat completions API, for load tests.
+
+Point ``OPENAI_BASE_URL`` at it (e.g. ``http://127.0.0.1:8100/v1``) and
+every AIService call is answered locally with configurable latency,
+failures and replies, without network access or cost.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORIES = ('personal', 'work', 'health', 'shopping', 'finance', 'education', 'travel', 'home')
+NUMBERED_TASK = re.compile(r'^\s*\d+\. Task:', re.MULTILINE)
+
+
+def default_reply(prompt, json_mode):
+    """A plausible answer for each AIService prompt, recognized by its wording"""
+    category = CATEGORIES[sum(map(ord, prompt)) % len(CATEGORIES)]
+    if '"categories"' in prompt:
+        return json.dumps({'categories': [category] * len(NUMBERED_TASK.findall(prompt))})
+    if '"complexity_score"' in prompt:
+        return json.dumps({'category': category, 'priority': 3, 'estimated_duration': 45, 'complexity_score': 4})
+    if '"due_date"' in prompt:
+        remaining = re.search(r'Remaining input: "(.*)"', prompt)
+        return json.dumps({
+            'title': remaining.group(1) if remaining else 'Task',
+            'description': '',
+            'due_date': None,
+            'priority': 3,
+            'category': category,
+        })
+    if 'Suggest a priority level' in prompt:
+        return '3'
+    if 'Estimate the duration' in prompt:
+        return '45'
+    return json.dumps({'result': category}) if json_mode else category
+
+
+class FakeLLM:
+    """Reply policy: latency distribution, failure rates and canned replies.
+
+    ``replies`` is a list of ``(regex, reply)`` pairs matched against the
+    prompt, first match wins; anything else gets ``default_reply``.
+    """
+
+    def __init__(self, latency_ms=300, jitter=0.5, distribution='lognormal', error_rate=0.0,
+                 rate_limit_rate=0.0, timeout_rate=0.0, timeout_ms=30000, replies=()):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_ms = timeout_ms
+        self.replies = [(re.compile(pattern), reply) for pattern, reply in replies]
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def latency(self):
+        """Seconds to wait before answering; ``latency_ms`` is the median"""
+        if self.distribution == 'constant':
+            milliseconds = self.latency_ms
+        elif self.distribution == 'uniform':
+            milliseconds = random.uniform(self.latency_ms * (1 - self.jitter), self.latency_ms * (1 + self.jitter))
+        else:
+            milliseconds = random.lognormvariate(0, self.jitter) * self.latency_ms
+        return max(milliseconds, 0) / 1000
+
+    def outcome(self):
+        """One of ``ok``, ``error``, ``rate_limit`` or ``timeout``"""
+        roll = random.random()
+        for name, rate in (('error', self.error_rate), ('rate_limit', self.rate_limit_rate), ('timeout', self.timeout_rate)):
+            if roll < rate:
+                return name
+            roll -= rate
+        return 'ok'
+
+    def reply(self, prompt, json_mode):
+        for pattern, reply in self.replies:
+            if pattern.search(prompt):
+                return reply
+        return default_reply(prompt, json_mode)
+
+
+def make_handler(llm):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self.send_json(404, {'error': {'message': f'Unknown path {self.path}', 'type': 'invalid_request_error'}})
+                return
+            with llm.lock:
+                llm.requests += 1
+
+            outcome = llm.outcome()
+            time.sleep(llm.timeout_ms / 1000 if outcome == 'timeout' else llm.latency())
+            if outcome == 'error':
+                self.send_json(500, {'error': {'message': 'Injected server error', 'type': 'server_error'}})
+                return
+            if outcome == 'rate_limit':
+                self.send_json(429, {'error': {'message': 'Injected rate limit', 'type': 'rate_limit_error'}})
+                return
+
+            prompt = '\n'.join(str(message.get('content', '')) for message in request.get('messages', []))
+            json_mode = (request.get('response_format') or {}).get('type') == 'json_object'
+            content = llm.reply(prompt, json_mode)
+            completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+            created = int(time.time())
+            model = request.get('model', 'fake')
+            usage = {
+                'prompt_tokens': len(prompt.split()),
+                'completion_tokens': len(content.split()),
+                'total_tokens': len(prompt.split()) + len(content.split()),
+            }
+            if request.get('stream'):
+                include_usage = (request.get('stream_options') or {}).get('include_usage')
+                self.stream(completion_id, created, model, content, usage if include_usage else None)
+                return
+            self.send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop',
+                }],
+                'usage': usage,
+            })
+
+        def stream(self, completion_id, created, model, content, usage=None):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            pieces = [content[start:start + 8] for start in range(0, len(content), 8)]
+            for delta in [{'role': 'assistant', 'content': ''}, *({'content': piece} for piece in pieces), {}]:
+                chunk = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': created,
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': delta, 'finish_reason': None if delta else 'stop'}],
+                }
+                self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+                self.wfile.flush()
+            if usage:
+                # Like the real API with stream_options.include_usage: one last chunk without choices
+                chunk = {
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                    'choices': [], 'usage': usage,
+                }
+                self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(llm, host='127.0.0.1', port=8100):
+    """Start the server; returns it so callers can ``shutdown()`` it"""
+    server = ThreadingHTTPServer((host, port), make_handler(llm))
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,171 @@
+import logging
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from .classifier import CATEGORY_PATTERN
+from .models import HabitProfile
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[a-z]+')
+STOPWORDS = {
+    'a', 'an', 'and', 'the', 'to', 'for', 'of', 'on', 'in', 'at', 'by', 'with', 'my', 'our', 'up',
+    'today', 'tomorrow', 'tonight', 'next', 'this', 'week', 'weekly', 'daily', 'monthly',
+}
+MAX_KEY_LENGTH = 100
+
+
+def cluster_key(title):
+    """Normalized title shared by repeats of the same task ("Pay rent" / "pay the rent!")"""
+    tokens = sorted({token for token in TOKEN_PATTERN.findall((title or '').lower()) if token not in STOPWORDS})
+    return ' '.join(tokens)[:MAX_KEY_LENGTH]
+
+
+def observation(row, at=None):
+    """The fields ``HabitMiner.observe`` reads from a raw task row, at ``at`` (default: its creation)"""
+    return {
+        'title': row.get('title'),
+        'category': row.get('category'),
+        'priority': row.get('priority'),
+        'estimated_duration': row.get('estimated_duration'),
+        'at': at or row.get('created_at'),
+    }
+
+
+class HabitMiner:
+    """Keeps each user's ``HabitProfile`` up to date and suggests tasks from it.
+
+    Every create and completion folds into the profile with one read and one
+    update, and suggestions read the profile alone, so neither ever rescans
+    the user's task history. The update is conditional on the profile's
+    ``version`` and is redone from a fresh read when a concurrent write got
+    there first. At most ``MAX_CLUSTERS`` title clusters are kept; the least
+    recently seen are forgotten first.
+    """
+    MAX_CLUSTERS = 200
+    MAX_ATTEMPTS = 5
+    SMOOTHING = 0.3  # weight of the newest interval in the moving averages
+    MIN_GAP = timedelta(hours=1)  # repeats closer than this are one occurrence
+    MIN_INTERVALS = 2
+    HORIZON = timedelta(days=3)
+
+    @classmethod
+    def observe(cls, user, created=(), completed=(), deleted=()):
+        """Fold new, completed and deleted open tasks into ``user``'s profile.
+
+        All take dicts with ``title`` and ``at`` (the time of the event);
+        created tasks also carry ``category``, ``priority`` and
+        ``estimated_duration``.
+        """
+        if not created and not completed and not deleted:
+            return
+        collection = HabitProfile._get_collection()
+        for _ in range(cls.MAX_ATTEMPTS):
+            profile = collection.find_one({'user': user.pk}, {'clusters': 1, 'version': 1}) or {}
+            update = cls.fold(profile.get('clusters', {}), created, completed, deleted)
+            update['$set']['version'] = (profile.get('version') or 0) + 1
+            try:
+                # A profile changed since the read no longer matches, and the upsert then hits the unique user index
+                collection.update_one({'user': user.pk, 'version': profile.get('version')}, update, upsert=True)
+                return
+            except DuplicateKeyError:
+                continue
+        logger.warning('Habit profile of user %s kept changing, dropped %d events', user.pk,
+                       len(created) + len(completed) + len(deleted))
+
+    @classmethod
+    def fold(cls, clusters, created, completed, deleted):
+        """The update that folds these events into a profile whose clusters were read as ``clusters``"""
+        changed = {}
+        increments = Counter()
+
+        for task in sorted(created, key=lambda task: task['at']):
+            at = task['at']
+            increments[f'day_of_week.{at.weekday()}'] += 1
+            if CATEGORY_PATTERN.match(task.get('category') or ''):
+                increments[f"category_counts.{task['category']}"] += 1
+            key = cluster_key(task['title'])
+            if not key:
+                continue
+            cluster = changed.get(key) or dict(clusters.get(key) or {
+                'count': 0, 'open': 0, 'completed': 0, 'intervals': 0, 'interval': None, 'deviation': 0,
+                'estimated_duration': task.get('estimated_duration') or 30,
+            })
+            last_at = cluster.get('last_at')
+            if last_at and at - last_at >= cls.MIN_GAP:
+                gap = (at - last_at).total_seconds()
+                if cluster['interval'] is None:
+                    cluster['interval'] = gap
+                else:
+                    cluster['deviation'] += cls.SMOOTHING * (abs(gap - cluster['interval']) - cluster['deviation'])
+                    cluster['interval'] += cls.SMOOTHING * (gap - cluster['interval'])
+                cluster['intervals'] += 1
+            cluster['estimated_duration'] += cls.SMOOTHING * (
+                (task.get('estimated_duration') or 30) - cluster['estimated_duration']
+            )
+            cluster.update({
+                'title': task['title'],
+                'category': task.get('category') or 'personal',
+                'priority': task.get('priority') or 3,
+                'count': cluster['count'] + 1,
+                'open': cluster['open'] + 1,
+                'last_at': max(at, last_at) if last_at else at,
+            })
+            changed[key] = cluster
+
+        for task, done in [*((task, True) for task in completed), *((task, False) for task in deleted)]:
+            if done:
+                increments[f"hour_of_day.{task['at'].hour}"] += 1
+            key = cluster_key(task['title'])
+            cluster = changed.get(key) or clusters.get(key)
+            if cluster:
+                cluster = changed[key] = dict(cluster)
+                cluster['completed'] += done
+                cluster['open'] = max(cluster['open'] - 1, 0)
+
+        update = {'$set': {'updated_at': datetime.utcnow()}}
+        if increments:
+            update['$inc'] = dict(increments)
+        known = {**clusters, **changed}
+        stale = sorted(known, key=lambda key: known[key]['last_at'])[:max(len(known) - cls.MAX_CLUSTERS, 0)]
+        for key in stale:
+            changed.pop(key, None)
+        update['$set'].update({f'clusters.{key}': cluster for key, cluster in changed.items()})
+        stale = [key for key in stale if key in clusters]
+        if stale:
+            update['$unset'] = {f'clusters.{key}': '' for key in stale}
+        return update
+
+    @classmethod
+    def suggest(cls, user, now, limit=5):
+        """Recurring tasks that are due again and not already open, most regular first"""
+        profile = HabitProfile._get_collection().find_one({'user': user.pk}) or {}
+        hours = profile.get('hour_of_day', {})
+        preferred_hour = int(max(hours, key=hours.get)) if hours else None
+
+        suggestions = []
+        for cluster in profile.get('clusters', {}).values():
+            if cluster['open'] or cluster['intervals'] < cls.MIN_INTERVALS:
+                continue
+            interval = timedelta(seconds=cluster['interval'])
+            due = cluster['last_at'] + interval
+            # Not due yet, or long overdue and so probably dropped
+            if due > now + cls.HORIZON or now > due + 2 * interval:
+                continue
+            regularity = max(0.0, 1 - cluster['deviation'] / cluster['interval'])
+            days = round(interval / timedelta(days=1))
+            suggestions.append({
+                'title': cluster['title'],
+                'category': cluster['category'],
+                'priority': cluster['priority'],
+                'estimated_duration': max(int(round(cluster['estimated_duration'])), 1),
+                'due_date': max(due, now),
+                'preferred_hour': preferred_hour,
+                'confidence_score': int(100 * regularity * min(cluster['intervals'], 5) / 5),
+                'reason': f"Usually repeats every {days} day{'s' if days != 1 else ''}" if days else "Usually repeats within a day",
+            })
+        suggestions.sort(key=lambda suggestion: -suggestion['confidence_score'])
+        return suggestions[:limit], profile.get('category_counts', {})
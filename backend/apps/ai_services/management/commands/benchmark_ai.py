@@ -0,0 +1,230 @@
+import json
+import random
+import secrets
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ai_services.cache import AIResultCache
+from apps.ai_services.fake_llm import serve
+from apps.ai_services.management.commands.fake_llm import add_policy_arguments, build_llm
+from apps.authentication.models import User
+
+TITLES = (
+    'Pay the electricity bill', 'Book dentist appointment', 'Prepare quarterly report', 'Buy groceries',
+    'Renew passport', 'Clean the garage', 'Study for the exam', 'Go for a run', 'Plan the team offsite',
+    'Fix the leaking tap', 'Call the insurance company', 'Review pull requests',
+)
+PHRASES = (
+    'call mom tomorrow at 6pm', 'submit expense report by friday !high', 'buy milk and eggs #shopping',
+    'pick up the thing for the project sometime', 'book flights to Lisbon next month',
+    'remember to sort out the stuff we discussed',
+)
+
+
+class Workload:
+    """Request bodies; a ``unique`` fraction of them is never seen before, the rest repeat a small pool"""
+
+    def __init__(self, unique, seed):
+        self.unique = unique
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.serial = 0
+
+    def pick(self, choices):
+        with self.lock:
+            self.serial += 1
+            choice = self.random.choice(choices)
+            if self.random.random() < self.unique:
+                return f'{choice} #{self.serial}'
+            return choice
+
+    def task(self):
+        return {'title': self.pick(TITLES), 'description': '', 'due_date': None}
+
+
+ENDPOINTS = {
+    'categorize': ('post', 'categorize/', lambda workload: workload.task()),
+    'suggest-priority': ('post', 'suggest-priority/', lambda workload: workload.task()),
+    'estimate-duration': ('post', 'estimate-duration/', lambda workload: workload.task()),
+    'analyze': ('post', 'analyze/', lambda workload: workload.task()),
+    'parse-natural': ('post', 'parse-natural/', lambda workload: {'text': workload.pick(PHRASES)}),
+    'categorize-batch': ('post', 'categorize-batch/', lambda workload: {'tasks': [workload.task() for _ in range(10)]}),
+    'suggestions': ('get', 'suggestions/', lambda workload: None),
+}
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the /api/ai endpoints at a fixed request rate and report latency percentiles and throughput. '
+        'Runs in process by default; pass --url and --token to load a running server.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help=f'Comma-separated: {", ".join(ENDPOINTS)}')
+        parser.add_argument('--rps', type=float, default=10, help='Target requests per second, across all endpoints')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds to send requests for')
+        parser.add_argument('--concurrency', type=int, default=32, help='Maximum requests in flight')
+        parser.add_argument('--unique', type=float, default=1.0,
+                            help='Fraction of requests with never-seen input; lower it to exercise the caches')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--url', help='Base URL of a running server, e.g. http://localhost:8000')
+        parser.add_argument('--token', help='JWT access token for --url')
+        parser.add_argument('--user', default='benchmark', help='User the in-process requests run as (created if missing)')
+        parser.add_argument('--fake-llm', action='store_true',
+                            help='Answer in-process model calls from a fake LLM server started for the run')
+        add_policy_arguments(parser, prefix='fake-')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        endpoints = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+        if options['rps'] <= 0 or options['duration'] <= 0:
+            raise CommandError('--rps and --duration must be positive')
+
+        server = None
+        if options['fake_llm']:
+            if options['url']:
+                raise CommandError('--fake-llm only applies in process; point the server at `manage.py fake_llm` instead')
+            llm = build_llm(options, prefix='fake-')
+            server = serve(llm, port=0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            settings.OPENAI_BASE_URL = 'http://%s:%s/v1' % server.server_address[:2]
+            settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or 'fake'
+        try:
+            send = self.http_sender(options) if options['url'] else self.local_sender(options)
+            report = self.run(send, endpoints, options)
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+
+        if not options['url']:
+            report['cache'] = AIResultCache().stats()
+        if server:
+            report['fake_llm_requests'] = llm.requests
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    def local_sender(self, options):
+        from rest_framework.test import APIClient
+
+        user = User.objects(username=options['user']).first()
+        if user is None:
+            # Only ever force-authenticated, so nobody can log in as it
+            user = User(username=options['user'], email=f"{options['user']}@example.com", password=f'!{secrets.token_hex(16)}')
+            user.save()
+        clients = threading.local()
+
+        def send(method, path, data):
+            if not hasattr(clients, 'client'):
+                clients.client = APIClient(HTTP_HOST='localhost')
+                clients.client.force_authenticate(user=user)
+            response = getattr(clients.client, method)(f'/api/ai/{path}', data, format='json')
+            return response.status_code
+        return send
+
+    def http_sender(self, options):
+        if not options['token']:
+            raise CommandError('--token is required with --url')
+        client = httpx.Client(
+            base_url=options['url'].rstrip('/') + '/api/ai/',
+            headers={'Authorization': f"Bearer {options['token']}"},
+            limits=httpx.Limits(max_connections=options['concurrency']),
+            timeout=60,
+        )
+
+        def send(method, path, data):
+            if method == 'get':
+                return client.get(path).status_code
+            return client.post(path, json=data).status_code
+        return send
+
+    def run(self, send, endpoints, options):
+        """Open-loop load: request i is due at ``i / rps`` whether or not earlier ones have finished.
+
+        Latency is measured from when a request was due, not from when a
+        worker got to it, so a saturated server shows up as queueing delay
+        instead of silently lowering the offered load.
+        """
+        workload = Workload(options['unique'], options['seed'])
+        chooser = random.Random(options['seed'])
+        total = int(options['rps'] * options['duration'])
+        latencies = defaultdict(list)
+        errors = defaultdict(lambda: defaultdict(int))
+        lock = threading.Lock()
+
+        def request(name, due):
+            method, path, body = ENDPOINTS[name]
+            try:
+                outcome = send(method, path, body(workload))
+            except Exception as e:
+                outcome = type(e).__name__
+            elapsed = time.perf_counter() - due
+            with lock:
+                latencies[name].append(elapsed)
+                if not (isinstance(outcome, int) and outcome < 400):
+                    errors[name][str(outcome)] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for number in range(total):
+                due = started + number / options['rps']
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(request, chooser.choice(endpoints), due)
+        elapsed = time.perf_counter() - started
+
+        report = {
+            'target_rps': options['rps'],
+            'achieved_rps': round(total / elapsed, 2),
+            'elapsed_seconds': round(elapsed, 2),
+            'endpoints': {},
+        }
+        for name in endpoints:
+            ordered = sorted(latencies[name])
+            report['endpoints'][name] = {
+                'requests': len(ordered),
+                'errors': dict(errors[name]),
+                'throughput_rps': round(len(ordered) / elapsed, 2),
+                **{
+                    f'{label}_ms': round(percentile(ordered, fraction) * 1000, 1)
+                    for label, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1))
+                },
+            }
+        return report
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"Target {report['target_rps']} rps, achieved {report['achieved_rps']} rps "
+            f"over {report['elapsed_seconds']}s"
+        )
+        self.stdout.write(f"{'endpoint':<20}{'requests':>9}{'errors':>8}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, row in report['endpoints'].items():
+            self.stdout.write(
+                f"{name:<20}{row['requests']:>9}{sum(row['errors'].values()):>8}{row['throughput_rps']:>8}"
+                f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}"
+            )
+            for outcome, count in row['errors'].items():
+                self.stdout.write(f'    {outcome}: {count}')
+        if 'cache' in report:
+            self.stdout.write(f"AI cache: {report['cache']}")
+        if 'fake_llm_requests' in report:
+            self.stdout.write(f"Fake LLM requests: {report['fake_llm_requests']}")
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from apps.ai_services.habits import HabitMiner, observation
+from apps.ai_services.models import HabitProfile
+from apps.authentication.models import User
+from apps.tasks.models import Task
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Rebuild habit profiles by replaying each user\'s task history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the profile of this username')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(username=options['user']) if options['user'] else User.objects.all()
+        rebuilt = 0
+        for user in users:
+            HabitProfile.objects(user=user).delete()
+            rows = (
+                Task.objects(user=user)
+                .order_by('created_at')
+                .only('title', 'category', 'priority', 'estimated_duration', 'status', 'created_at', 'updated_at')
+                .as_pymongo()
+            )
+            created, completed = [], []
+            for row in rows:
+                created.append(observation(row))
+                if row.get('status') == 'completed':
+                    completed.append(observation(row, row['updated_at']))
+                if len(created) >= BATCH_SIZE:
+                    HabitMiner.observe(user, created=created)
+                    created = []
+            HabitMiner.observe(user, created=created)
+            HabitMiner.observe(user, completed=completed)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'{rebuilt} habit profiles rebuilt'))
@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from apps.ai_services.fake_llm import FakeLLM, serve
+
+
+def add_policy_arguments(parser, prefix=''):
+    """Options of the fake server's reply policy, shared with ``benchmark_ai``"""
+    parser.add_argument(f'--{prefix}latency-ms', type=float, default=300, help='Median reply latency')
+    parser.add_argument(f'--{prefix}jitter', type=float, default=0.5,
+                        help='Spread: sigma of the lognormal, or +/- fraction for uniform')
+    parser.add_argument(f'--{prefix}distribution', choices=('constant', 'uniform', 'lognormal'), default='lognormal')
+    parser.add_argument(f'--{prefix}error-rate', type=float, default=0.0, help='Fraction answered with HTTP 500')
+    parser.add_argument(f'--{prefix}rate-limit-rate', type=float, default=0.0, help='Fraction answered with HTTP 429')
+    parser.add_argument(f'--{prefix}timeout-rate', type=float, default=0.0, help='Fraction answered after --timeout-ms')
+    parser.add_argument(f'--{prefix}timeout-ms', type=float, default=30000)
+    parser.add_argument(f'--{prefix}replies',
+                        help='JSON file of {"regex": "reply"} pairs matched against the prompt, in order')
+
+
+def build_llm(options, prefix=''):
+    prefix = prefix.replace('-', '_')
+    replies = ()
+    if options[f'{prefix}replies']:
+        with open(options[f'{prefix}replies']) as replies_file:
+            replies = json.load(replies_file).items()
+    return FakeLLM(
+        latency_ms=options[f'{prefix}latency_ms'],
+        jitter=options[f'{prefix}jitter'],
+        distribution=options[f'{prefix}distribution'],
+        error_rate=options[f'{prefix}error_rate'],
+        rate_limit_rate=options[f'{prefix}rate_limit_rate'],
+        timeout_rate=options[f'{prefix}timeout_rate'],
+        timeout_ms=options[f'{prefix}timeout_ms'],
+        replies=replies,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Serve a local fake of the OpenAI chat completions API (set OPENAI_BASE_URL to use it)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8100)
+        add_policy_arguments(parser)
+
+    def handle(self, *args, **options):
+        llm = build_llm(options)
+        server = serve(llm, options['host'], options['port'])
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(f'Fake LLM listening, use OPENAI_BASE_URL=http://{host}:{port}/v1'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'{llm.requests} requests served')
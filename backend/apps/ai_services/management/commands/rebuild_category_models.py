@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.ai_services.classifier import CategoryClassifier, learned_examples
+from apps.ai_services.models import CategoryModel
+from apps.authentication.models import User
+from apps.tasks.models import Task
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the local category classifier from the tasks it learned, repairing any drift in its counts'
+
+    def handle(self, *args, **options):
+        CategoryModel.objects.delete()
+        learned = 0
+        for user in User.objects.only('id'):
+            rows = (
+                Task.objects(user=user, ai_metadata__learned_category__exists=True)
+                .only('title', 'description', 'ai_metadata')
+                .as_pymongo()
+            )
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    CategoryClassifier.learn(user, learned_examples(batch))
+                    learned += len(batch)
+                    batch = []
+            CategoryClassifier.learn(user, learned_examples(batch))
+            learned += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Classifier rebuilt from {learned} tasks'))
@@ -0,0 +1,247 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import Counter
+
+import openai
+from django.conf import settings
+
+from .cache import AIResultCache
+from .client import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))  # seconds
+SOURCES = ('local', 'cache', 'llm', 'fallback')
+TOKEN_KINDS = ('prompt', 'completion')
+ERROR_KINDS = (
+    (CircuitOpenError, 'circuit_open'),
+    (openai.APITimeoutError, 'timeout'),
+    (openai.APIConnectionError, 'connection'),
+    (openai.RateLimitError, 'rate_limit'),
+    (openai.InternalServerError, 'server'),
+    (openai.APIStatusError, 'bad_request'),
+    (ValueError, 'bad_reply'),  # includes json.JSONDecodeError
+    (Exception, 'other'),
+)
+
+# Methods decorated with ``instrumented``, so the exporter knows every label set
+METHODS = []
+
+_current_call = contextvars.ContextVar('ai_call', default=None)
+
+
+def error_kind(error):
+    return next(kind for error_class, kind in ERROR_KINDS if isinstance(error, error_class))
+
+
+def bucket_label(bound):
+    return '+Inf' if bound == float('inf') else str(bound)
+
+
+class AIMetrics:
+    """Process-wide counters and latency histograms for AIService calls.
+
+    Increments are collected in memory and flushed to the shared AI cache
+    at most every ``FLUSH_INTERVAL`` seconds, so recording costs no Redis
+    round trip on the request path and the exporter sees every worker's
+    totals. Durations are kept as integer milliseconds.
+    """
+    FLUSH_INTERVAL = 1.0
+    PREFIX = 'ai:metrics'
+
+    def __init__(self):
+        self.pending = Counter()
+        self.lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+
+    def increment(self, name, *labels, amount=1):
+        key = ':'.join((self.PREFIX, name, *labels))
+        with self.lock:
+            self.pending[key] += amount
+            if time.monotonic() - self.flushed_at < self.FLUSH_INTERVAL:
+                return
+            pending, self.pending = self.pending, Counter()
+            self.flushed_at = time.monotonic()
+        self.flush(pending)
+
+    def observe(self, name, method, seconds):
+        bound = next(bound for bound in LATENCY_BUCKETS if seconds <= bound)
+        self.increment(f'{name}_bucket', method, bucket_label(bound))
+        self.increment(f'{name}_sum', method, amount=int(seconds * 1000))
+        self.increment(f'{name}_count', method)
+
+    def flush(self, pending=None):
+        if pending is None:
+            with self.lock:
+                pending, self.pending = self.pending, Counter()
+                self.flushed_at = time.monotonic()
+        AIResultCache().incr_many(pending)
+
+    def record_upstream(self, method, seconds, response=None, error=None):
+        """Record one provider call and add its usage to the current AIService call"""
+        self.observe('ai_upstream_duration_seconds', method, seconds)
+        self.record_usage(method, getattr(response, 'usage', None))
+        if error is not None:
+            self.increment('ai_upstream_errors_total', method, error_kind(error))
+
+        call = _current_call.get()
+        if call is not None:
+            call['upstream_calls'] += 1
+            call['upstream_ms'] += int(seconds * 1000)
+            if error is not None:
+                call['error'] = error_kind(error)
+
+    def record_usage(self, method, usage):
+        """Count the tokens of a provider ``usage`` (an object or, in streamed chunks, a dict)"""
+        if isinstance(usage, dict):
+            tokens = {'prompt': usage.get('prompt_tokens') or 0, 'completion': usage.get('completion_tokens') or 0}
+        else:
+            tokens = {
+                'prompt': getattr(usage, 'prompt_tokens', 0) or 0,
+                'completion': getattr(usage, 'completion_tokens', 0) or 0,
+            }
+        for kind, count in tokens.items():
+            if count:
+                self.increment('ai_tokens_total', method, kind, amount=count)
+        call = _current_call.get()
+        if call is not None:
+            call['prompt_tokens'] += tokens['prompt']
+            call['completion_tokens'] += tokens['completion']
+
+    def render(self, model):
+        """Prometheus text exposition of every worker's flushed totals, costed at ``model``'s prices"""
+        self.flush()
+        keys = []
+        for method in METHODS:
+            keys += [f'{self.PREFIX}:ai_requests_total:{method}:{source}' for source in SOURCES]
+            keys += [f'{self.PREFIX}:ai_tokens_total:{method}:{kind}' for kind in TOKEN_KINDS]
+            keys += [f'{self.PREFIX}:ai_upstream_errors_total:{method}:{kind}' for _, kind in ERROR_KINDS]
+            for name in ('ai_request_duration_seconds', 'ai_upstream_duration_seconds'):
+                keys += [f'{self.PREFIX}:{name}_bucket:{method}:{bucket_label(bound)}' for bound in LATENCY_BUCKETS]
+                keys += [f'{self.PREFIX}:{name}_sum:{method}', f'{self.PREFIX}:{name}_count:{method}']
+        values = AIResultCache().call('get_many', keys)
+
+        def value(*parts):
+            return values.get(':'.join((self.PREFIX, *parts)), 0)
+
+        prices = settings.AI_TOKEN_PRICES.get(model, {})
+        lines = [
+            '# HELP ai_requests_total AIService calls by method and the path that answered them.',
+            '# TYPE ai_requests_total counter',
+        ]
+        lines += [
+            f'ai_requests_total{{method="{method}",source="{source}"}} {value("ai_requests_total", method, source)}'
+            for method in METHODS for source in SOURCES
+        ]
+        lines += ['# HELP ai_tokens_total Tokens reported by the provider.', '# TYPE ai_tokens_total counter']
+        lines += [
+            f'ai_tokens_total{{method="{method}",kind="{kind}"}} {value("ai_tokens_total", method, kind)}'
+            for method in METHODS for kind in TOKEN_KINDS
+        ]
+        lines += ['# HELP ai_cost_usd_total Estimated provider cost from token usage.', '# TYPE ai_cost_usd_total counter']
+        lines += [
+            f'ai_cost_usd_total{{method="{method}"}} '
+            f'{sum(value("ai_tokens_total", method, kind) * prices.get(kind, 0) / 1000 for kind in TOKEN_KINDS):.6f}'
+            for method in METHODS
+        ]
+        lines += ['# HELP ai_upstream_errors_total Failed provider calls by error kind.', '# TYPE ai_upstream_errors_total counter']
+        lines += [
+            f'ai_upstream_errors_total{{method="{method}",kind="{kind}"}} {value("ai_upstream_errors_total", method, kind)}'
+            for method in METHODS for _, kind in ERROR_KINDS
+        ]
+        for name, help_text in (
+            ('ai_request_duration_seconds', 'End-to-end AIService call latency.'),
+            ('ai_upstream_duration_seconds', 'Provider call latency, including retries.'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for method in METHODS:
+                cumulative = 0
+                for bound in LATENCY_BUCKETS:
+                    cumulative += value(f'{name}_bucket', method, bucket_label(bound))
+                    lines.append(f'{name}_bucket{{method="{method}",le="{bucket_label(bound)}"}} {cumulative}')
+                lines.append(f'{name}_sum{{method="{method}"}} {value(f"{name}_sum", method) / 1000}')
+                lines.append(f'{name}_count{{method="{method}"}} {value(f"{name}_count", method)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = AIMetrics()
+
+
+def estimate_tokens(text):
+    """Rough token count of ``text`` (about four characters per token), for replies without usage"""
+    return (len(text) + 3) // 4
+
+
+def instrumented(method):
+    """Record latency, source, tokens and errors of an AIService method.
+
+    The source is ``fallback`` when a provider call or its reply failed,
+    ``llm`` when the provider answered, ``cache`` for a cached result and
+    ``local`` otherwise. One JSON log line is written per call. Generator
+    methods are measured from the first item until they finish or are
+    closed, each step running in the call's own context.
+    """
+    if method not in METHODS:
+        METHODS.append(method)
+
+    def start():
+        return {
+            'method': method, 'source': None, 'error': None, 'upstream_calls': 0,
+            'upstream_ms': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+        }, time.perf_counter()
+
+    def finish(call, started):
+        seconds = time.perf_counter() - started
+        if call['error']:
+            call['source'] = 'fallback'
+        elif call['upstream_calls']:
+            call['source'] = 'llm'
+        call['source'] = call['source'] or 'local'
+        call['duration_ms'] = round(seconds * 1000, 2)
+        metrics.increment('ai_requests_total', method, call['source'])
+        metrics.observe('ai_request_duration_seconds', method, seconds)
+        logger.info(json.dumps({'event': 'ai_call', **call}))
+
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def stream_wrapper(*args, **kwargs):
+                call, started = start()
+                context = contextvars.copy_context()
+                context.run(_current_call.set, call)
+                generator = func(*args, **kwargs)
+                try:
+                    while True:
+                        try:
+                            item = context.run(next, generator)
+                        except StopIteration:
+                            return
+                        yield item
+                finally:
+                    context.run(generator.close)
+                    finish(call, started)
+            return stream_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call, started = start()
+            token = _current_call.set(call)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current_call.reset(token)
+                finish(call, started)
+        return wrapper
+    return decorator
+
+
+def mark(**fields):
+    """Annotate the AIService call in progress (e.g. ``source='cache'``)"""
+    call = _current_call.get()
+    if call is not None:
+        call.update(fields)
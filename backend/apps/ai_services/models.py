@@ -0,0 +1,52 @@
+from mongoengine import Document, ReferenceField, DictField, IntField, DateTimeField, StringField
+from datetime import datetime
+from apps.authentication.models import User
+
+
+class CategoryModel(Document):
+    """One shard of the naive Bayes counts behind the local task classifier.
+
+    A user's model is one document per category; the global prior (``user``
+    unset) is split further into ``AI_CLASSIFIER_PRIOR_SHARDS`` documents
+    per category, so writes from all users spread out and no document grows
+    past one category's hashed features. Counts are only ever updated with
+    ``$inc``.
+    """
+    user = ReferenceField(User)
+    category = StringField(required=True)
+    shard = IntField(default=0)
+    document_count = IntField(default=0)  # tasks in this category
+    token_count = IntField(default=0)
+    feature_counts = DictField(default={})  # hashed feature -> count
+    updated_at = DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'category_model_shards',
+        'indexes': [
+            {'fields': ['user', 'category', 'shard'], 'unique': True},
+        ]
+    }
+
+
+class HabitProfile(Document):
+    """Incrementally mined habits of one user.
+
+    ``clusters`` maps a normalized title key to a summary of the tasks with
+    that title: counts, last creation, a moving average of the time between
+    them and its deviation. The histograms count task creations by weekday
+    and completions by hour.
+    """
+    user = ReferenceField(User, required=True)
+    clusters = DictField(default={})
+    category_counts = DictField(default={})
+    day_of_week = DictField(default={})  # "0" (Monday) .. "6" -> tasks created
+    hour_of_day = DictField(default={})  # "0" .. "23" -> tasks completed
+    version = IntField(default=0)  # bumped by every update, for optimistic concurrency
+    updated_at = DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'habit_profiles',
+        'indexes': [
+            {'fields': ['user'], 'unique': True},
+        ]
+    }
@@ -0,0 +1,224 @@
+import re
+from calendar import monthrange
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+# Full names only: abbreviations like "sat" and "sun" are too often ordinary words
+WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3, 'apr': 4, 'april': 4,
+    'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7, 'aug': 8, 'august': 8,
+    'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10, 'nov': 11, 'november': 11,
+    'dec': 12, 'december': 12,
+}
+NUMBERS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6}
+PRIORITY_WORDS = {'lowest': 1, 'low': 2, 'medium': 3, 'normal': 3, 'high': 4, 'urgent': 5, 'critical': 5}
+CATEGORY_KEYWORDS = {
+    'work': {'meeting', 'report', 'email', 'client', 'project', 'deadline', 'presentation', 'office', 'boss', 'standup'},
+    'health': {'doctor', 'dentist', 'gym', 'workout', 'run', 'yoga', 'medicine', 'pharmacy', 'appointment', 'therapy'},
+    'shopping': {'buy', 'groceries', 'grocery', 'shop', 'shopping', 'order', 'store', 'supermarket'},
+    'finance': {'pay', 'bill', 'bills', 'rent', 'bank', 'tax', 'taxes', 'invoice', 'budget', 'insurance'},
+    'education': {'study', 'homework', 'exam', 'class', 'course', 'lecture', 'assignment', 'learn', 'read'},
+    'travel': {'flight', 'hotel', 'trip', 'pack', 'passport', 'visa', 'airport', 'train'},
+    'home': {'clean', 'laundry', 'repair', 'fix', 'vacuum', 'dishes', 'garden', 'plumber', 'cook'},
+    'personal': {'call', 'mom', 'dad', 'birthday', 'friend', 'family', 'gift', 'party'},
+}
+
+MONTH_NAMES = '|'.join(sorted(MONTHS, key=len, reverse=True))
+WEEKDAY_NAMES = '|'.join(sorted(WEEKDAYS, key=len, reverse=True))
+NUMBER_WORDS = '|'.join(NUMBERS)
+PREPOSITION = r'(?:\b(?:on|by|due|before|until)\s+)?'
+
+PRIORITY_PATTERN = re.compile(
+    rf'(?<!\S)!(?:([1-5])|({"|".join(PRIORITY_WORDS)})|(!*))(?!\S)', re.IGNORECASE
+)
+TAG_PATTERN = re.compile(r'(?<!\S)#(\w[\w-]*)')
+TIME_PATTERNS = (
+    re.compile(r'(?:\b(?:at|by)\s+)?\b(1[0-2]|0?[1-9])(?::([0-5]\d))?\s*(am|pm)\b', re.IGNORECASE),
+    re.compile(r'(?:\b(?:at|by)\s+)?\b([01]?\d|2[0-3]):([0-5]\d)\b()', re.IGNORECASE),
+    re.compile(r'(?:\b(?:at|by)\s+)?\b(noon|midnight)\b()()', re.IGNORECASE),
+)
+DATE_PATTERNS = (
+    ('iso', re.compile(rf'{PREPOSITION}\b(\d{{4}})-(\d{{1,2}})-(\d{{1,2}})\b', re.IGNORECASE)),
+    ('numeric', re.compile(rf'{PREPOSITION}\b(\d{{1,2}})/(\d{{1,2}})(?:/(\d{{2}}|\d{{4}}))?\b', re.IGNORECASE)),
+    ('month_day', re.compile(
+        rf'{PREPOSITION}\b({MONTH_NAMES})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(\d{{4}})\b)?', re.IGNORECASE
+    )),
+    ('day_month', re.compile(
+        rf'{PREPOSITION}\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({MONTH_NAMES})\b(?:,?\s+(\d{{4}})\b)?', re.IGNORECASE
+    )),
+    ('relative', re.compile(
+        rf'\bin\s+(\d+|{NUMBER_WORDS})\s+(minute|min|hour|hr|day|week|month)s?\b', re.IGNORECASE
+    )),
+    ('day_after_tomorrow', re.compile(rf'{PREPOSITION}\bday after tomorrow\b', re.IGNORECASE)),
+    ('named_day', re.compile(rf'{PREPOSITION}\b(today|tonight|tomorrow|tmrw|tmr)\b', re.IGNORECASE)),
+    ('end_of', re.compile(rf'{PREPOSITION}\b(?:end of (?:the )?(day|week|month)|(eod|eow|eom))\b', re.IGNORECASE)),
+    ('next_period', re.compile(rf'{PREPOSITION}\bnext\s+(week|month)\b', re.IGNORECASE)),
+    ('weekday', re.compile(rf'{PREPOSITION}\b(?:(next|this)\s+)?({WEEKDAY_NAMES})\b', re.IGNORECASE)),
+)
+# Date and time words the grammar could not place; they make a parse ambiguous
+AMBIGUOUS_PATTERN = re.compile(
+    rf"\b(?:at|by|on|before|after|around|until|till)\s+\d|"
+    rf"\b(?:weekend|week|month|year|morning|afternoon|evening|o'?clock|later|soon|someday|sometime)\b|"
+    rf"\b(?:{'|'.join(name for name in MONTHS if len(name) > 4)}|{WEEKDAY_NAMES})\b|\b\d{{1,2}}[:/.]\d|"
+    rf"\b\d{{4}}-\d{{1,2}}(?:-\d{{1,2}})?\b",
+    re.IGNORECASE,
+)
+WORD_PATTERN = re.compile(r'[a-z]+')
+DANGLING_PATTERN = re.compile(r'^(?:(?:to|and|at|on|by|due|for)\b\s*)+|(?:\s*\b(?:to|and|at|on|by|due|for))+$', re.IGNORECASE)
+END_OF_DAY = (23, 59)
+
+
+def _resolve_date(kind, groups, now):
+    """Return ``(date, time)`` for one matched date expression; ``time`` may be None"""
+    today = now.date()
+    if kind == 'iso':
+        return datetime(int(groups[0]), int(groups[1]), int(groups[2])).date(), None
+    if kind in ('numeric', 'month_day', 'day_month'):
+        if kind == 'numeric':
+            month, day, year = int(groups[0]), int(groups[1]), groups[2]
+        elif kind == 'month_day':
+            month, day, year = MONTHS[groups[0].lower()], int(groups[1]), groups[2]
+        else:
+            day, month, year = int(groups[0]), MONTHS[groups[1].lower()], groups[2]
+        if year:
+            year = int(year) + (2000 if len(year) == 2 else 0)
+            return datetime(year, month, day).date(), None
+        date = datetime(today.year, month, day).date()
+        # A bare "jan 5" means the next one, not one already past
+        return (date if date >= today else date.replace(year=today.year + 1)), None
+    if kind == 'relative':
+        amount = NUMBERS.get(groups[0].lower()) or int(groups[0])
+        unit = groups[1].lower()
+        if unit in ('minute', 'min', 'hour', 'hr'):
+            moment = now + timedelta(minutes=amount * (60 if unit in ('hour', 'hr') else 1))
+            return moment.date(), (moment.hour, moment.minute)
+        if unit == 'month':
+            return today + relativedelta(months=amount), None
+        return today + timedelta(days=amount * (7 if unit == 'week' else 1)), None
+    if kind == 'day_after_tomorrow':
+        return today + timedelta(days=2), None
+    if kind == 'named_day':
+        word = groups[0].lower()
+        if word == 'tonight':
+            return today, (20, 0)
+        return today + timedelta(days=0 if word == 'today' else 1), None
+    if kind == 'end_of':
+        period = (groups[0] or {'eod': 'day', 'eow': 'week', 'eom': 'month'}[groups[1].lower()]).lower()
+        if period == 'day':
+            return today, END_OF_DAY
+        if period == 'week':
+            return today + timedelta(days=(4 - today.weekday()) % 7), END_OF_DAY
+        return today.replace(day=monthrange(today.year, today.month)[1]), END_OF_DAY
+    if kind == 'next_period':
+        if groups[0].lower() == 'week':
+            return today + timedelta(days=7 - today.weekday()), None
+        return (today + relativedelta(months=1)).replace(day=1), None
+    # weekday: the next such day, skipping today; "next friday" skips a further week
+    # when this week's friday has not passed yet
+    modifier, weekday = (groups[0] or '').lower(), WEEKDAYS[groups[1].lower()]
+    ahead = (weekday - today.weekday()) % 7
+    if modifier == 'this':
+        return today + timedelta(days=ahead), None
+    ahead = ahead or 7
+    if modifier == 'next' and ahead < 7 - today.weekday():
+        ahead += 7
+    return today + timedelta(days=ahead), None
+
+
+def _resolve_time(groups):
+    hour, minute, meridiem = groups
+    if hour.lower() == 'noon':
+        return 12, 0
+    if hour.lower() == 'midnight':
+        return 23, 59
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem.lower() == 'pm' else 0)
+    return hour, minute
+
+
+def parse_task_text(text, now, categories):
+    """Parse a task from free text with a small deterministic grammar.
+
+    Recognizes priority markers (``!high``, ``!4``, ``!!``), ``#tags``,
+    absolute and relative dates and times, and category keywords. Whatever
+    is left becomes the title. Returns the task fields (``priority`` and
+    ``category`` are None when not found) with a ``confidence_score`` that
+    drops for leftover date-like words, conflicting dates, an empty title
+    and a missing category, so callers can hand only those cases to the LLM.
+    """
+    state = {'priority': None, 'tags': [], 'dates': [], 'times': []}
+
+    def take_priority(match):
+        digit, word, bangs = match.groups()
+        if digit:
+            state['priority'] = int(digit)
+        elif word:
+            state['priority'] = PRIORITY_WORDS[word.lower()]
+        else:
+            state['priority'] = 4 if not bangs else 5
+        return ' '
+
+    def take_tag(match):
+        state['tags'].append(match.group(1).lower())
+        return ' '
+
+    rest = PRIORITY_PATTERN.sub(take_priority, text)
+    rest = TAG_PATTERN.sub(take_tag, rest)
+    for kind, pattern in DATE_PATTERNS:
+        def take_date(match, kind=kind):
+            try:
+                state['dates'].append(_resolve_date(kind, match.groups(), now))
+            except (ValueError, OverflowError):  # e.g. "feb 30", "in 999999999999 minutes"
+                return match.group(0)
+            return ' '
+        rest = pattern.sub(take_date, rest)
+    for pattern in TIME_PATTERNS:
+        def take_time(match):
+            state['times'].append(_resolve_time(match.groups()))
+            return ' '
+        rest = pattern.sub(take_time, rest)
+
+    ambiguous = bool(AMBIGUOUS_PATTERN.search(rest))
+    title = DANGLING_PATTERN.sub('', ' '.join(rest.split()).strip(' ,;:-')).strip(' ,;:-')
+
+    due_date = None
+    if state['dates'] or state['times']:
+        date, time = state['dates'][0] if state['dates'] else (now.date(), None)
+        if state['times']:
+            time = state['times'][0]
+        hour, minute = time or END_OF_DAY
+        due_date = datetime(date.year, date.month, date.day, hour, minute)
+        # A bare "5pm" that already passed today means tomorrow
+        if not state['dates'] and due_date < now:
+            due_date += timedelta(days=1)
+
+    category = next((tag for tag in state['tags'] if tag in categories), None)
+    if category is None:
+        words = WORD_PATTERN.findall(title.lower())
+        hits = {name: sum(word in keywords for word in words) for name, keywords in CATEGORY_KEYWORDS.items()}
+        best = max(hits, key=hits.get)
+        if hits[best] and list(hits.values()).count(hits[best]) == 1 and best in categories:
+            category = best
+
+    confidence = 100
+    if ambiguous or len(state['dates']) > 1 or len(state['times']) > 1:
+        confidence -= 50
+    if not title:
+        confidence -= 50
+    if category is None:
+        confidence -= 20
+
+    return {
+        'title': title,
+        'description': '',
+        'due_date': due_date.strftime('%Y-%m-%d %H:%M') if due_date else None,
+        'priority': state['priority'],
+        'category': category,
+        'tags': state['tags'],
+        'confidence_score': max(confidence, 0),
+    }
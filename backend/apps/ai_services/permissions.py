@@ -0,0 +1,12 @@
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+
+class HasMetricsToken(BasePermission):
+    """Allows requests carrying ``AI_METRICS_TOKEN`` in the X-Metrics-Token header, for metrics scrapers"""
+
+    def has_permission(self, request, view):
+        token = request.META.get('HTTP_X_METRICS_TOKEN', '')
+        return bool(settings.AI_METRICS_TOKEN) and hmac.compare_digest(token, settings.AI_METRICS_TOKEN)
@@ -1,118 +1,330 @@
-import openai
-import re
-from datetime import datetime, timedelta
+import asyncio
+import json
+from datetime import datetime, time, timedelta
 from django.conf import settings
+from time import perf_counter
 from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from .cache import AIResultCache
+from .classifier import CATEGORIES, CategoryClassifier
+from .client import acall_with_retries, call_with_retries, get_async_client, get_client, run_async
+from .habits import HabitMiner
+from .metrics import error_kind, estimate_tokens, instrumented, mark, metrics
+from .nlp import parse_task_text
+from .scheduler import build_schedule
+from .streaming import JSONFieldStream
 
 
 class AIService:
     """AI service for task management features"""
     
+    MODEL = "gpt-3.5-turbo"
+    CATEGORIES = list(CATEGORIES)
+    # Bump when a prompt changes so cached results from the old prompt are not reused
+    PROMPT_VERSION = 1
+    CATEGORY_SUGGESTIONS = {
+        'personal': ['Review personal goals', 'Plan weekend activities', 'Organize personal space'],
+        'work': ['Review weekly progress', 'Plan next week', 'Update professional skills'],
+        'health': ['Schedule workout', 'Plan healthy meals', 'Book medical checkup'],
+        'shopping': ['Create shopping list', 'Research product reviews', 'Compare prices'],
+        'finance': ['Review monthly budget', 'Pay bills', 'Update financial records'],
+        'education': ['Read educational material', 'Practice new skills', 'Enroll in course'],
+        'travel': ['Research destinations', 'Plan trip itinerary', 'Book accommodations'],
+        'home': ['Home maintenance check', 'Organize living space', 'Plan home improvements']
+    }
+    
     def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = get_client()
+        self.cache = AIResultCache()
+        self.classifier = CategoryClassifier(self.CATEGORIES)
+    
+    def _cached(self, method: str, inputs: Dict, compute):
+        computed = []
+        try:
+            result = self.cache.get_or_compute(
+                method, inputs, lambda: computed.append(True) or compute(), self.MODEL, self.PROMPT_VERSION
+            )
+        except Exception as e:
+            mark(error=error_kind(e))
+            raise
+        if not computed:
+            mark(source='cache')
+        return result
     
-    def categorize_task(self, title: str, description: str = "") -> Dict:
-        """Categorize a task based on its title and description"""
+    def _complete(self, method: str, **kwargs):
+        """Create a chat completion within ``method``'s latency budget, retries and circuit breaker"""
+        started = perf_counter()
         try:
+            response = call_with_retries(
+                method,
+                lambda timeout: self.client.chat.completions.create(timeout=timeout, **kwargs)
+            )
+        except Exception as e:
+            metrics.record_upstream(method, perf_counter() - started, error=e)
+            raise
+        metrics.record_upstream(method, perf_counter() - started, response)
+        return response
+    
+    @instrumented('categorize_task')
+    def categorize_task(self, title: str, description: str = "", user=None) -> Dict:
+        """Categorize a task based on its title and description.
+
+        With a ``user``, the local classifier trained on their history
+        answers when it is confident enough; otherwise the LLM is asked.
+        ``source`` reports which path answered: local, cache, llm or fallback.
+        """
+        try:
+            if user is not None:
+                category, probability = self.classifier.predict(user, title, description)
+                if category and probability >= settings.AI_CLASSIFIER_CONFIDENCE:
+                    return {
+                        'category': category,
+                        'confidence_score': int(probability * 100),
+                        'suggested_category': category,
+                        'source': 'local'
+                    }
+            
+            computed = []
+            result = self._cached(
+                'categorize_task',
+                {'title': title, 'description': description},
+                lambda: computed.append(True) or self._categorize_task(title, description)
+            )
+            return {**result, 'source': 'llm' if computed else 'cache'}
+        except Exception as e:
+            return {
+                'category': 'personal',
+                'confidence_score': 0,
+                'suggested_category': 'personal',
+                'source': 'fallback',
+                'error': str(e)
+            }
+    
+    def _categorize_prompt(self, title: str, description: str) -> str:
+        return f"""
+        Categorize the following task into one of these categories:
+        - personal: Personal tasks, hobbies, self-care
+        - work: Work-related tasks, professional development
+        - health: Health, fitness, medical appointments
+        - shopping: Shopping, errands, purchases
+        - finance: Financial tasks, bills, budgeting
+        - education: Learning, studying, courses
+        - travel: Travel planning, trips, transportation
+        - home: Home maintenance, cleaning, repairs
+        
+        Task: {title}
+        Description: {description}
+        
+        Return only the category name (e.g., "personal", "work", etc.)
+        """
+    
+    def _category_result(self, category: str) -> Dict:
+        category = category.strip().lower()
+        
+        # Validate category
+        if category not in self.CATEGORIES:
+            category = 'personal'
+        
+        return {
+            'category': category,
+            'confidence_score': 85,
+            'suggested_category': category
+        }
+    
+    def _categorize_task(self, title: str, description: str) -> Dict:
+        response = self._complete(
+            'categorize_task',
+            model=self.MODEL,
+            messages=[{"role": "user", "content": self._categorize_prompt(title, description)}],
+            max_tokens=10,
+            temperature=0.1
+        )
+        
+        return self._category_result(response.choices[0].message.content)
+    
+    @instrumented('categorize_batch')
+    def categorize_batch(self, items: List[Dict], user=None) -> List[Dict]:
+        """Categorize many tasks, returning one result per item in input order.
+
+        Each item goes through the same local classifier and cache as
+        ``categorize_task``. The rest are packed ``AI_BATCH_PROMPT_SIZE`` to a
+        prompt and sent concurrently (at most ``AI_BATCH_CONCURRENCY`` requests
+        in flight). Items from a chunk whose reply cannot be used are retried
+        one by one. Failed items get an ``error`` instead of failing the batch.
+        """
+        results = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            title = (item.get('title') or '').strip()
+            description = item.get('description') or ''
+            if not title:
+                results[index] = {'error': 'Title is required'}
+                continue
+            if user is not None:
+                try:
+                    category, probability = self.classifier.predict(user, title, description)
+                except Exception as e:
+                    results[index] = {
+                        'category': 'personal',
+                        'confidence_score': 0,
+                        'suggested_category': 'personal',
+                        'source': 'fallback',
+                        'error': str(e)
+                    }
+                    continue
+                if category and probability >= settings.AI_CLASSIFIER_CONFIDENCE:
+                    results[index] = {
+                        'category': category,
+                        'confidence_score': int(probability * 100),
+                        'suggested_category': category,
+                        'source': 'local'
+                    }
+                    continue
+            cached = self.cache.lookup(
+                'categorize_task', {'title': title, 'description': description}, self.MODEL, self.PROMPT_VERSION
+            )
+            if cached is not None:
+                results[index] = {**cached, 'source': 'cache'}
+                continue
+            pending.append((index, title, description))
+        
+        if pending:
+            for index, result in run_async(self._categorize_remote(pending)).items():
+                results[index] = result
+        return results
+    
+    async def _categorize_remote(self, pending: List[Tuple[int, str, str]]) -> Dict[int, Dict]:
+        client = get_async_client()
+        semaphore = asyncio.Semaphore(settings.AI_BATCH_CONCURRENCY)
+        size = settings.AI_BATCH_PROMPT_SIZE
+        chunks = [pending[start:start + size] for start in range(0, len(pending), size)]
+        results = {}
+        for chunk_results in await asyncio.gather(*(
+            self._categorize_chunk(client, semaphore, chunk) for chunk in chunks
+        )):
+            results.update(chunk_results)
+        return results
+    
+    async def _categorize_chunk(self, client, semaphore, chunk: List[Tuple[int, str, str]]) -> Dict[int, Dict]:
+        if len(chunk) > 1:
+            listing = "\n".join(
+                f"{number}. Task: {title} | Description: {description}"
+                for number, (_, title, description) in enumerate(chunk, start=1)
+            )
             prompt = f"""
-            Categorize the following task into one of these categories:
-            - personal: Personal tasks, hobbies, self-care
-            - work: Work-related tasks, professional development
-            - health: Health, fitness, medical appointments
-            - shopping: Shopping, errands, purchases
-            - finance: Financial tasks, bills, budgeting
-            - education: Learning, studying, courses
-            - travel: Travel planning, trips, transportation
-            - home: Home maintenance, cleaning, repairs
+            Categorize each of the following tasks into one of these categories:
+            {", ".join(self.CATEGORIES)}
             
-            Task: {title}
-            Description: {description}
+            {listing}
             
-            Return only the category name (e.g., "personal", "work", etc.)
+            Return a JSON object {{"categories": [...]}} with one category name per task, in order.
             """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
+            try:
+                response = await self._acomplete(
+                    client, semaphore,
+                    model=self.MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    response_format={"type": "json_object"},
+                    max_tokens=10 * len(chunk),
+                    temperature=0.1
+                )
+                categories = json.loads(response.choices[0].message.content)['categories']
+                if len(categories) == len(chunk):
+                    return {
+                        index: self._store_category(title, description, str(category))
+                        for (index, title, description), category in zip(chunk, categories)
+                    }
+            except Exception:
+                pass  # fall through to one request per item
+        
+        results = await asyncio.gather(*(
+            self._categorize_one(client, semaphore, title, description) for _, title, description in chunk
+        ))
+        return {index: result for (index, _, _), result in zip(chunk, results)}
+    
+    async def _categorize_one(self, client, semaphore, title: str, description: str) -> Dict:
+        try:
+            response = await self._acomplete(
+                client, semaphore,
+                model=self.MODEL,
+                messages=[{"role": "user", "content": self._categorize_prompt(title, description)}],
                 max_tokens=10,
                 temperature=0.1
             )
-            
-            category = response.choices[0].message.content.strip().lower()
-            
-            # Validate category
-            valid_categories = ['personal', 'work', 'health', 'shopping', 'finance', 'education', 'travel', 'home']
-            if category not in valid_categories:
-                category = 'personal'
-            
-            return {
-                'category': category,
-                'confidence_score': 85,
-                'suggested_category': category
-            }
-            
+            return self._store_category(title, description, response.choices[0].message.content)
         except Exception as e:
             return {
                 'category': 'personal',
                 'confidence_score': 0,
                 'suggested_category': 'personal',
+                'source': 'fallback',
                 'error': str(e)
             }
     
+    async def _acomplete(self, client, semaphore, **kwargs):
+        """Async chat completion with the same budget, retries and circuit breaker as ``_complete``"""
+        async def request(timeout):
+            async with semaphore:
+                started = perf_counter()
+                try:
+                    response = await client.chat.completions.create(timeout=timeout, **kwargs)
+                except Exception as e:
+                    metrics.record_upstream('categorize_batch', perf_counter() - started, error=e)
+                    raise
+                metrics.record_upstream('categorize_batch', perf_counter() - started, response)
+                return response
+        
+        return await acall_with_retries('categorize_batch', request)
+    
+    def _store_category(self, title: str, description: str, category: str) -> Dict:
+        result = self._category_result(category)
+        self.cache.store(
+            'categorize_task', {'title': title, 'description': description}, self.MODEL, self.PROMPT_VERSION, result
+        )
+        return {**result, 'source': 'llm'}
+    
+    def _rule_based_priority(self, title: str, description: str = "", due_date: Optional[datetime] = None) -> int:
+        """Priority from urgency keywords and how soon the task is due"""
+        priority = 3  # Default medium priority
+        
+        # Check for urgency keywords
+        urgency_keywords = ['urgent', 'asap', 'immediately', 'critical', 'emergency', 'deadline']
+        title_lower = title.lower()
+        description_lower = description.lower()
+        
+        for keyword in urgency_keywords:
+            if keyword in title_lower or keyword in description_lower:
+                priority = 5
+                break
+        
+        # Check due date
+        if due_date:
+            days_until_due = (due_date - datetime.now()).days
+            if days_until_due < 0:  # Overdue
+                priority = 5
+            elif days_until_due <= 1:  # Due today or tomorrow
+                priority = max(priority, 4)
+            elif days_until_due <= 3:  # Due this week
+                priority = max(priority, 3)
+            elif days_until_due <= 7:  # Due next week
+                priority = max(priority, 2)
+        
+        return priority
+    
+    @instrumented('suggest_priority')
     def suggest_priority(self, title: str, description: str = "", due_date: Optional[datetime] = None) -> Dict:
         """Suggest priority level for a task"""
+        priority = self._rule_based_priority(title, description, due_date)
         try:
-            # Base priority calculation
-            priority = 3  # Default medium priority
-            
-            # Check for urgency keywords
-            urgency_keywords = ['urgent', 'asap', 'immediately', 'critical', 'emergency', 'deadline']
-            title_lower = title.lower()
-            description_lower = description.lower()
-            
-            for keyword in urgency_keywords:
-                if keyword in title_lower or keyword in description_lower:
-                    priority = 5
-                    break
-            
-            # Check due date
-            if due_date:
-                days_until_due = (due_date - datetime.now()).days
-                if days_until_due < 0:  # Overdue
-                    priority = 5
-                elif days_until_due <= 1:  # Due today or tomorrow
-                    priority = max(priority, 4)
-                elif days_until_due <= 3:  # Due this week
-                    priority = max(priority, 3)
-                elif days_until_due <= 7:  # Due next week
-                    priority = max(priority, 2)
-            
-            # AI-based priority suggestion
-            prompt = f"""
-            Suggest a priority level (1-5) for this task:
-            - 1: Very low priority, can be done anytime
-            - 2: Low priority, not urgent
-            - 3: Medium priority, normal importance
-            - 4: High priority, should be done soon
-            - 5: Very high priority, urgent/critical
-            
-            Task: {title}
-            Description: {description}
-            Due Date: {due_date.strftime('%Y-%m-%d') if due_date else 'No due date'}
-            
-            Return only the number (1-5).
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=5,
-                temperature=0.1
+            # AI-based priority suggestion; only this part is cached since the
+            # rule-based part above depends on the current time
+            due_date_text = due_date.strftime('%Y-%m-%d') if due_date else 'No due date'
+            ai_priority = self._cached(
+                'suggest_priority',
+                {'title': title, 'description': description, 'due_date': due_date_text},
+                lambda: self._suggest_priority(title, description, due_date_text)
             )
             
-            ai_priority = int(response.choices[0].message.content.strip())
-            ai_priority = max(1, min(5, ai_priority))  # Ensure it's between 1-5
-            
             # Combine rule-based and AI-based priority
             final_priority = max(priority, ai_priority)
             
@@ -124,177 +336,360 @@ class AIService:
             
         except Exception as e:
             return {
-                'priority': 3,
+                'priority': priority,
                 'confidence_score': 0,
-                'reasoning': 'Default priority due to error',
+                'reasoning': 'Based on urgency keywords and due date only, AI analysis unavailable',
                 'error': str(e)
             }
     
+    def _suggest_priority(self, title: str, description: str, due_date_text: str) -> int:
+        prompt = f"""
+        Suggest a priority level (1-5) for this task:
+        - 1: Very low priority, can be done anytime
+        - 2: Low priority, not urgent
+        - 3: Medium priority, normal importance
+        - 4: High priority, should be done soon
+        - 5: Very high priority, urgent/critical
+        
+        Task: {title}
+        Description: {description}
+        Due Date: {due_date_text}
+        
+        Return only the number (1-5).
+        """
+        
+        response = self._complete(
+            'suggest_priority',
+            model=self.MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=5,
+            temperature=0.1
+        )
+        
+        ai_priority = int(response.choices[0].message.content.strip())
+        return max(1, min(5, ai_priority))  # Ensure it's between 1-5
+    
+    @instrumented('parse_natural_language')
     def parse_natural_language(self, text: str) -> Dict:
-        """Parse natural language input to extract task details"""
+        """Parse natural language input to extract task details.
+
+        The local grammar in ``nlp`` answers when it is confident enough;
+        otherwise only the text it could not place is sent to the LLM, and
+        the fields it did extract take precedence over the model's.
+        ``source`` reports which path answered: local, cache, llm or fallback.
+        """
+        now = datetime.now()
+        parsed = parse_task_text(text, now, self.CATEGORIES)
+        if parsed['confidence_score'] >= settings.AI_NLP_CONFIDENCE:
+            return self._merge_parse(text, parsed, None, 'local')
+        
+        inputs = self._parse_inputs(parsed, now)
         try:
-            prompt = f"""
-            Parse the following natural language task input and extract:
-            1. Task title
-            2. Description (if any)
-            3. Due date (if mentioned)
-            4. Priority level (1-5)
-            5. Category
-            
-            Input: "{text}"
-            
-            Return a JSON object with these fields:
-            {{
-                "title": "extracted title",
-                "description": "extracted description or empty string",
-                "due_date": "YYYY-MM-DD HH:MM or null",
-                "priority": number 1-5,
-                "category": "personal/work/health/shopping/finance/education/travel/home"
-            }}
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            computed = []
+            result = self._cached(
+                'parse_natural_language',
+                inputs,
+                lambda: computed.append(True) or self._parse_natural_language(parsed['title'] or text, inputs, now)
+            )
+            return self._merge_parse(text, parsed, result, 'llm' if computed else 'cache')
+        except Exception as e:
+            return {**self._merge_parse(text, parsed, None, 'fallback'), 'error': str(e)}
+    
+    @instrumented('parse_natural_language')
+    def stream_natural_language(self, text: str):
+        """Streaming ``parse_natural_language`` yielding ``(event, data)`` pairs.
+
+        ``field`` events carry fields as soon as they are known: first those
+        the local grammar extracted, then each one the model finishes. A
+        single ``result`` event with the validated task always comes last.
+        """
+        now = datetime.now()
+        parsed = parse_task_text(text, now, self.CATEGORIES)
+        if parsed['confidence_score'] >= settings.AI_NLP_CONFIDENCE:
+            yield 'result', self._merge_parse(text, parsed, None, 'local')
+            return
+        
+        inputs = self._parse_inputs(parsed, now)
+        if inputs['known']:
+            yield 'field', inputs['known']
+        try:
+            result = self.cache.lookup('parse_natural_language', inputs, self.MODEL, self.PROMPT_VERSION)
+            if result is not None:
+                mark(source='cache')
+                yield 'result', self._merge_parse(text, parsed, result, 'cache')
+                return
+            
+            prompt = self._parse_prompt(parsed['title'] or text, inputs, now)
+            stream = self._complete(
+                'parse_natural_language',
+                model=self.MODEL,
                 messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"},
                 max_tokens=200,
-                temperature=0.1
+                temperature=0.1,
+                stream=True,
+                # Ask for a final chunk with the token usage
+                extra_body={"stream_options": {"include_usage": True}}
             )
-            
-            # Parse the response (this is a simplified version)
-            content = response.choices[0].message.content.strip()
-            
-            # Extract information using regex patterns
-            title_match = re.search(r'"title":\s*"([^"]+)"', content)
-            description_match = re.search(r'"description":\s*"([^"]*)"', content)
-            due_date_match = re.search(r'"due_date":\s*"([^"]*)"', content)
-            priority_match = re.search(r'"priority":\s*(\d+)', content)
-            category_match = re.search(r'"category":\s*"([^"]+)"', content)
-            
-            result = {
-                'title': title_match.group(1) if title_match else text,
-                'description': description_match.group(1) if description_match else '',
-                'due_date': due_date_match.group(1) if due_date_match and due_date_match.group(1) != 'null' else None,
-                'priority': int(priority_match.group(1)) if priority_match else 3,
-                'category': category_match.group(1) if category_match else 'personal'
-            }
-            
-            return result
-            
+            reply = JSONFieldStream()
+            usage = None
+            for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                # Fields the grammar extracted win, so the model's are not sent for those
+                fields = {
+                    name: value for name, value in reply.feed(delta or '').items()
+                    if name not in inputs['known']
+                }
+                if fields:
+                    yield 'field', fields
+            
+            # Providers that ignore stream_options send no usage; estimate it rather than report the call as free
+            metrics.record_usage('parse_natural_language', usage or {
+                'prompt_tokens': estimate_tokens(prompt), 'completion_tokens': estimate_tokens(reply.buffer),
+            })
+            result = self._parse_reply(reply.buffer)
+            self.cache.store('parse_natural_language', inputs, self.MODEL, self.PROMPT_VERSION, result)
+            yield 'result', self._merge_parse(text, parsed, result, 'llm')
         except Exception as e:
-            return {
-                'title': text,
-                'description': '',
-                'due_date': None,
-                'priority': 3,
-                'category': 'personal',
-                'error': str(e)
-            }
+            mark(error=error_kind(e))
+            yield 'result', {**self._merge_parse(text, parsed, None, 'fallback'), 'error': str(e)}
+    
+    @staticmethod
+    def _parse_inputs(parsed: Dict, now: datetime) -> Dict:
+        return {
+            'text': parsed['title'],
+            'known': {field: parsed[field] for field in ('due_date', 'priority', 'category') if parsed[field]},
+            # Relative dates ("tomorrow") resolve differently each day
+            'today': now.date().isoformat(),
+        }
+    
+    @staticmethod
+    def _merge_parse(text: str, parsed: Dict, result: Optional[Dict], source: str) -> Dict:
+        result = result or {}
+        return {
+            **parsed,
+            'title': result.get('title') or parsed['title'] or text,
+            'description': result.get('description', ''),
+            'due_date': parsed['due_date'] or result.get('due_date'),
+            'priority': parsed['priority'] or result.get('priority') or 3,
+            'category': parsed['category'] or result.get('category') or 'personal',
+            'source': source
+        }
+    
+    def _parse_prompt(self, text: str, inputs: Dict, now: datetime) -> str:
+        return f"""
+        Parse the following natural language task input and extract:
+        1. Task title
+        2. Description (if any)
+        3. Due date (if mentioned)
+        4. Priority level (1-5)
+        5. Category
+        
+        Today is {now.strftime('%A %Y-%m-%d %H:%M')}.
+        Already extracted from the full input: {json.dumps(inputs['known'])}
+        Remaining input: "{text}"
+        
+        Return a JSON object with these fields:
+        {{
+            "title": "extracted title",
+            "description": "extracted description or empty string",
+            "due_date": "YYYY-MM-DD HH:MM or null",
+            "priority": number 1-5,
+            "category": "{'/'.join(self.CATEGORIES)}"
+        }}
+        """
     
+    def _parse_natural_language(self, text: str, inputs: Dict, now: datetime) -> Dict:
+        response = self._complete(
+            'parse_natural_language',
+            model=self.MODEL,
+            messages=[{"role": "user", "content": self._parse_prompt(text, inputs, now)}],
+            response_format={"type": "json_object"},
+            max_tokens=200,
+            temperature=0.1
+        )
+        return self._parse_reply(response.choices[0].message.content)
+    
+    def _parse_reply(self, content: str) -> Dict:
+        data = json.loads(content)
+        
+        due_date = data.get('due_date')
+        try:
+            due_date = datetime.strptime(due_date, '%Y-%m-%d %H:%M').strftime('%Y-%m-%d %H:%M')
+        except (TypeError, ValueError):
+            due_date = None
+        category = str(data.get('category', '')).strip().lower()
+        
+        return {
+            'title': str(data.get('title') or '').strip(),
+            'description': str(data.get('description') or '').strip(),
+            'due_date': due_date,
+            'priority': max(1, min(5, int(data.get('priority') or 3))),
+            'category': category if category in self.CATEGORIES else 'personal'
+        }
+    
+    @instrumented('estimate_duration')
     def estimate_duration(self, title: str, description: str = "") -> int:
         """Estimate task duration in minutes"""
         try:
-            prompt = f"""
-            Estimate the duration of this task in minutes:
-            Task: {title}
-            Description: {description}
-            
-            Consider:
-            - Simple tasks: 15-30 minutes
-            - Medium tasks: 30-120 minutes
-            - Complex tasks: 2-8 hours
-            - Very complex tasks: 8+ hours
-            
-            Return only the number of minutes.
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=10,
-                temperature=0.1
+            return self._cached(
+                'estimate_duration',
+                {'title': title, 'description': description},
+                lambda: self._estimate_duration(title, description)
             )
-            
-            duration = int(response.choices[0].message.content.strip())
-            return max(15, min(duration, 480))  # Between 15 minutes and 8 hours
-            
         except Exception as e:
             return 30  # Default 30 minutes
     
-    def get_task_suggestions(self, user_tasks: List[Dict]) -> List[Dict]:
-        """Get AI-powered task suggestions based on user history"""
+    def _estimate_duration(self, title: str, description: str) -> int:
+        prompt = f"""
+        Estimate the duration of this task in minutes:
+        Task: {title}
+        Description: {description}
+        
+        Consider:
+        - Simple tasks: 15-30 minutes
+        - Medium tasks: 30-120 minutes
+        - Complex tasks: 2-8 hours
+        - Very complex tasks: 8+ hours
+        
+        Return only the number of minutes.
+        """
+        
+        response = self._complete(
+            'estimate_duration',
+            model=self.MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=10,
+            temperature=0.1
+        )
+        
+        duration = int(response.choices[0].message.content.strip())
+        return max(15, min(duration, 480))  # Between 15 minutes and 8 hours
+    
+    @instrumented('analyze_task')
+    def analyze_task(self, title: str, description: str = "", due_date: Optional[datetime] = None) -> Dict:
+        """Get category, priority, duration and complexity from a single completion"""
+        priority = self._rule_based_priority(title, description, due_date)
         try:
-            if not user_tasks:
-                return []
-            
-            # Analyze user patterns
-            categories = {}
-            priorities = {}
-            completion_times = []
-            
-            for task in user_tasks:
-                category = task.get('category', 'personal')
-                categories[category] = categories.get(category, 0) + 1
-                
-                priority = task.get('priority', 3)
-                priorities[priority] = priorities.get(priority, 0) + 1
-                
-                if task.get('status') == 'completed':
-                    completion_times.append(task.get('estimated_duration', 30))
-            
-            # Generate suggestions based on patterns
-            suggestions = []
-            
-            # Suggest tasks based on most common categories
-            most_common_category = max(categories.items(), key=lambda x: x[1])[0] if categories else 'personal'
-            
-            category_suggestions = {
-                'personal': ['Review personal goals', 'Plan weekend activities', 'Organize personal space'],
-                'work': ['Review weekly progress', 'Plan next week', 'Update professional skills'],
-                'health': ['Schedule workout', 'Plan healthy meals', 'Book medical checkup'],
-                'shopping': ['Create shopping list', 'Research product reviews', 'Compare prices'],
-                'finance': ['Review monthly budget', 'Pay bills', 'Update financial records'],
-                'education': ['Read educational material', 'Practice new skills', 'Enroll in course'],
-                'travel': ['Research destinations', 'Plan trip itinerary', 'Book accommodations'],
-                'home': ['Home maintenance check', 'Organize living space', 'Plan home improvements']
+            due_date_text = due_date.strftime('%Y-%m-%d') if due_date else 'No due date'
+            analysis = self._cached(
+                'analyze_task',
+                {'title': title, 'description': description, 'due_date': due_date_text},
+                lambda: self._analyze_task(title, description, due_date_text)
+            )
+            return {
+                **analysis,
+                'priority': max(priority, analysis['priority']),
+                'confidence_score': 80,
             }
             
-            for suggestion in category_suggestions.get(most_common_category, []):
+        except Exception as e:
+            return {
+                'category': 'personal',
+                'suggested_category': 'personal',
+                'priority': priority,
+                'estimated_duration': 30,
+                'complexity_score': 5,
+                'confidence_score': 0,
+                'error': str(e)
+            }
+    
+    def _analyze_task(self, title: str, description: str, due_date_text: str) -> Dict:
+        prompt = f"""
+        Analyze this task and return a JSON object with these fields:
+        {{
+            "category": one of {", ".join(self.CATEGORIES)},
+            "priority": number 1-5 (1 very low, 3 medium, 5 urgent/critical),
+            "estimated_duration": number of minutes (simple 15-30, medium 30-120, complex 120-480),
+            "complexity_score": number 1-10
+        }}
+        
+        Task: {title}
+        Description: {description}
+        Due Date: {due_date_text}
+        """
+        
+        response = self._complete(
+            'analyze_task',
+            model=self.MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            max_tokens=60,
+            temperature=0.1
+        )
+        
+        data = json.loads(response.choices[0].message.content)
+        
+        category = str(data.get('category', '')).strip().lower()
+        if category not in self.CATEGORIES:
+            category = 'personal'
+        
+        return {
+            'category': category,
+            'suggested_category': category,
+            'priority': max(1, min(5, int(data['priority']))),
+            'estimated_duration': max(15, min(int(data['estimated_duration']), 480)),
+            'complexity_score': max(1, min(10, int(data['complexity_score']))),
+        }
+    
+    @instrumented('get_task_suggestions')
+    def get_task_suggestions(self, user, limit: int = 5) -> List[Dict]:
+        """Suggest tasks from the user's mined habits.
+
+        Recurring tasks that are due again come first; the rest of the list
+        is filled with general suggestions for the user's most common
+        category. Both are read from the precomputed ``HabitProfile``.
+        """
+        try:
+            suggestions, category_counts = HabitMiner.suggest(user, datetime.utcnow(), limit)
+            if len(suggestions) >= limit or not category_counts:
+                return suggestions
+            
+            most_common_category = max(category_counts.items(), key=lambda x: x[1])[0]
+            habitual = {suggestion['title'].lower() for suggestion in suggestions}
+            for suggestion in self.CATEGORY_SUGGESTIONS.get(most_common_category, []):
+                if suggestion.lower() in habitual:
+                    continue
                 suggestions.append({
                     'title': suggestion,
                     'category': most_common_category,
                     'priority': 3,
                     'estimated_duration': 30,
-                    'confidence_score': 70
+                    'confidence_score': 50
                 })
             
-            return suggestions[:5]  # Return top 5 suggestions
+            return suggestions[:limit]
             
         except Exception as e:
             return []
     
-    def optimize_schedule(self, tasks: List[Dict]) -> List[Dict]:
-        """Optimize task schedule based on priority, duration, and deadlines"""
-        try:
-            if not tasks:
-                return []
-            
-            # Sort tasks by priority (descending) and due date (ascending)
-            sorted_tasks = sorted(tasks, key=lambda x: (
-                -x.get('priority', 3),
-                x.get('due_date', datetime.max) if x.get('due_date') else datetime.max
-            ))
-            
-            # Add scheduling metadata
-            current_time = datetime.now()
-            for i, task in enumerate(sorted_tasks):
-                task['suggested_order'] = i + 1
-                task['estimated_start_time'] = current_time + timedelta(minutes=i * 30)
-                
-                # Estimate completion time
-                duration = task.get('estimated_duration', 30)
-                task['estimated_completion_time'] = task['estimated_start_time'] + timedelta(minutes=duration)
-            
-            return sorted_tasks
-            
-        except Exception as e:
-            return tasks 
\ No newline at end of file
+    @instrumented('optimize_schedule')
+    def optimize_schedule(self, tasks: List[Dict], fixed_tasks: List[Dict] = (), start: Optional[datetime] = None,
+                          work_start: Optional[str] = None, work_end: Optional[str] = None,
+                          work_days: Optional[List[int]] = None, tz: str = 'UTC') -> Dict:
+        """Schedule tasks within working hours around fixed-time tasks.
+
+        Working hours are in the IANA time zone ``tz``; all datetimes are
+        naive UTC. Fixed tasks occupy ``estimated_duration`` minutes from
+        their due date. See ``scheduler.build_schedule`` for the ordering; raises
+        ``ValueError`` for invalid working hours.
+        """
+        work_start = time.fromisoformat(work_start or settings.SCHEDULE_WORK_START)
+        work_end = time.fromisoformat(work_end or settings.SCHEDULE_WORK_END)
+        if work_end <= work_start:
+            raise ValueError('work_end must be after work_start')
+        busy = [
+            (task['due_date'], task['due_date'] + timedelta(minutes=task.get('estimated_duration') or 30))
+            for task in fixed_tasks if task.get('due_date')
+        ]
+        return build_schedule(
+            tasks,
+            start or datetime.utcnow(),
+            work_start,
+            work_end,
+            settings.SCHEDULE_WORK_DAYS if work_days is None else work_days,
+            busy,
+            timedelta(hours=settings.SCHEDULE_PRIORITY_WEIGHT_HOURS),
+            ZoneInfo(tz or 'UTC'),
+        )
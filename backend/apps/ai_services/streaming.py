@@ -0,0 +1,76 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+def wants_stream(request):
+    """Whether the client asked for Server-Sent Events with ``?stream=true``"""
+    return request.query_params.get('stream', '').lower() in ('1', 'true')
+
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+def event_stream_response(events):
+    """Stream ``(event, data)`` pairs from a generator as Server-Sent Events.
+
+    Events are written as they are produced, so nothing but the generator
+    is held per connection.
+    """
+    response = StreamingHttpResponse(
+        (sse_event(event, data) for event, data in events),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class JSONFieldStream:
+    """Incrementally extract the top-level fields of a streamed JSON object.
+
+    ``feed`` takes the next piece of model output and returns the fields
+    completed by it. Each character is scanned once, tracking only nesting
+    depth and string state.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.member_start = None
+
+    def feed(self, text):
+        start = len(self.buffer)
+        self.buffer += text
+        fields = {}
+        for index in range(start, len(self.buffer)):
+            char = self.buffer[index]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+                if self.depth == 1:
+                    self.member_start = index + 1
+            elif char in '}]' or (char == ',' and self.depth == 1):
+                if self.depth == 1 and self.member_start is not None:
+                    member = self.buffer[self.member_start:index].strip()
+                    try:
+                        fields.update(json.loads('{' + member + '}'))
+                    except ValueError:
+                        pass
+                    self.member_start = index + 1
+                if char != ',':
+                    self.depth -= 1
+        return fields
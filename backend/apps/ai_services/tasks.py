@@ -0,0 +1,144 @@
+import logging
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from celery import shared_task
+from django.conf import settings
+
+from apps.analytics.models import ROLLUP_FIELDS, TaskRollup
+from apps.tasks.models import Task
+from .cache import AIResultCache
+from .services import AIService
+
+logger = logging.getLogger(__name__)
+
+# Task fields the enrichment job may fill in when the user did not set them
+ENRICHABLE_FIELDS = ('category', 'priority', 'estimated_duration', 'complexity_score')
+
+# While the broker is unreachable, writes skip enqueueing instead of waiting on it
+_broker_down_until = 0
+
+
+class EnrichmentError(Exception):
+    """Raised when the analysis fell back to defaults, so the job is retried"""
+
+
+def task_version(updated_at):
+    """Version string for a task save, at the millisecond precision MongoDB stores"""
+    return updated_at.replace(microsecond=updated_at.microsecond // 1000 * 1000).isoformat()
+
+
+def enqueue_enrichment(task, provided=()):
+    """Schedule ``enrich_task`` for the current version of ``task``.
+
+    Fields named in ``provided`` were set by the user and are never
+    overwritten. The same version is only enqueued once, and a broker
+    outage is logged rather than failing the write.
+    """
+    enqueue_enrichment_many([(task, provided)])
+
+
+def enqueue_enrichment_many(items):
+    """Schedule enrichment for many ``(task, provided)`` pairs, e.g. after a bulk create.
+
+    Dedupe keys are checked and set in one round trip each, and the jobs
+    are published ``AI_ENRICHMENT_BATCH_SIZE`` to a message, so a large
+    import costs a few broker round trips instead of two per task.
+    """
+    global _broker_down_until
+    if not items or not settings.AI_ENRICHMENT_ENABLED or time.monotonic() < _broker_down_until:
+        return
+    jobs = {}
+    for task, provided in items:
+        version = task_version(task.updated_at)
+        fields = [field for field in ENRICHABLE_FIELDS if field not in provided]
+        jobs[f'ai:enrich:{task.pk}:{version}'] = (str(task.pk), version, fields)
+
+    cache = AIResultCache()
+    if len(jobs) == 1:
+        key = next(iter(jobs))
+        if not cache.call('add', key, 1, settings.AI_ENRICHMENT_DEDUPE_TTL):
+            return
+    else:
+        enqueued = cache.call('get_many', list(jobs))
+        jobs = {key: job for key, job in jobs.items() if key not in enqueued}
+        if not jobs:
+            return
+        cache.call('set_many', dict.fromkeys(jobs, 1), settings.AI_ENRICHMENT_DEDUPE_TTL)
+
+    keys = list(jobs)
+    size = settings.AI_ENRICHMENT_BATCH_SIZE
+    for start in range(0, len(keys), size):
+        chunk = keys[start:start + size]
+        try:
+            if len(chunk) == 1:
+                enrich_task.apply_async(jobs[chunk[0]], retry=False)
+            else:
+                enrich_tasks.apply_async(([jobs[key] for key in chunk],), retry=False)
+        except Exception as e:
+            logger.warning('Could not enqueue enrichment of %d tasks: %s', len(keys) - start, e)
+            _broker_down_until = time.monotonic() + settings.AI_CACHE_REDIS_RETRY_SECONDS
+            # Let a later write enqueue these versions again
+            cache.call('delete_many', keys[start:])
+            return
+
+
+@shared_task(
+    autoretry_for=(EnrichmentError,),
+    retry_backoff=True,
+    retry_jitter=True,
+    max_retries=settings.AI_ENRICHMENT_MAX_RETRIES,
+    acks_late=True,
+    ignore_result=True,
+)
+def enrich_task(task_id, version, fields=ENRICHABLE_FIELDS):
+    """Fill AI fields of one task version.
+
+    The write is conditional on ``updated_at`` still matching ``version``,
+    so a redelivered job, or one overtaken by a newer edit, changes nothing.
+    """
+    row = (
+        Task.objects(id=task_id)
+        .only('user', 'title', 'description', 'due_date', 'updated_at', *ROLLUP_FIELDS)
+        .as_pymongo()
+        .first()
+    )
+    if row is None or task_version(row['updated_at']) != version:
+        return 'stale'
+
+    analysis = AIService().analyze_task(row['title'], row.get('description') or '', row.get('due_date'))
+    if 'error' in analysis:
+        raise EnrichmentError(analysis['error'])
+
+    update = {
+        'suggested_category': analysis['suggested_category'],
+        'confidence_score': analysis['confidence_score'],
+        'ai_metadata.enriched_version': version,
+        'ai_metadata.enriched_fields': list(fields),
+        'ai_metadata.enriched_at': datetime.utcnow(),
+        'ai_metadata.model': AIService.MODEL,
+        'updated_at': datetime.utcnow(),
+    }
+    for field in fields:
+        update[field] = analysis[field]
+
+    result = Task._get_collection().update_one(
+        {'_id': ObjectId(task_id), 'updated_at': row['updated_at']},
+        {'$set': update},
+    )
+    if not result.modified_count:
+        return 'stale'
+    TaskRollup.apply(row['user'], added=[{**row, **update}], removed=[row])
+    return 'enriched'
+
+
+@shared_task(acks_late=True, ignore_result=True)
+def enrich_tasks(jobs):
+    """Enrich a batch of ``(task_id, version, fields)``; failed tasks are retried one by one"""
+    for task_id, version, fields in jobs:
+        try:
+            enrich_task(task_id, version, fields)
+        except Exception as e:
+            logger.warning('Enrichment of task %s failed, retrying on its own: %s', task_id, e)
+            enrich_task.apply_async((task_id, version, fields), countdown=1)
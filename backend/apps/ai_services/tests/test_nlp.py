@@ -0,0 +1,106 @@
+from datetime import datetime
+
+from django.test import SimpleTestCase
+
+from apps.ai_services.classifier import CATEGORIES
+from apps.ai_services.nlp import parse_task_text
+from apps.ai_services.services import AIService
+
+NOW = datetime(2024, 3, 4, 10, 0)  # a Monday
+
+
+def parse(text):
+    return parse_task_text(text, NOW, CATEGORIES)
+
+
+class ParseTaskTextTests(SimpleTestCase):
+    def test_full_task(self):
+        self.assertEqual(parse('Pay rent tomorrow at 5pm !high #finance'), {
+            'title': 'Pay rent',
+            'description': '',
+            'due_date': '2024-03-05 17:00',
+            'priority': 4,
+            'category': 'finance',
+            'tags': ['finance'],
+            'confidence_score': 100,
+        })
+
+    def test_dates(self):
+        cases = {
+            'Call mom in 2 hours': '2024-03-04 12:00',
+            'Dentist 9am': '2024-03-05 09:00',  # already past today
+            'Submit report next friday': '2024-03-15 23:59',
+            'Buy milk by jan 5': '2025-01-05 23:59',  # the next jan 5
+            'Finish slides eod': '2024-03-04 23:59',
+            'Email client on 2024-03-20 at 14:30': '2024-03-20 14:30',
+        }
+        for text, due_date in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(parse(text)['due_date'], due_date)
+
+    def test_dates_are_removed_from_the_title(self):
+        self.assertEqual(parse('Submit report next friday')['title'], 'Submit report')
+        self.assertEqual(parse('Buy milk by jan 5')['title'], 'Buy milk')
+
+    def test_invalid_date_stays_in_the_title(self):
+        parsed = parse('Plan party feb 30')
+        self.assertEqual(parsed['title'], 'Plan party feb 30')
+        self.assertIsNone(parsed['due_date'])
+
+    def test_out_of_range_offset_stays_in_the_title(self):
+        for text in ('x in 999999999999 minutes', 'x in 999999999999 days', 'x in 99999999 months'):
+            with self.subTest(text=text):
+                parsed = parse(text)
+                self.assertEqual(parsed['title'], text)
+                self.assertIsNone(parsed['due_date'])
+
+    def test_priority_markers(self):
+        for text, priority in (('Task !2', 2), ('Task !urgent', 5), ('Task !', 4), ('Task !!', 5), ('Task', None)):
+            with self.subTest(text=text):
+                self.assertEqual(parse(text)['priority'], priority)
+
+    def test_category_from_a_tag_or_keywords(self):
+        self.assertEqual(parse('Call mom in 2 hours')['category'], 'personal')
+        self.assertEqual(parse('Dentist 9am')['category'], 'health')
+        parsed = parse('Review notes #someday')
+        self.assertEqual(parsed['tags'], ['someday'])
+        self.assertIsNone(parsed['category'])
+
+    def test_confidence_drops_for_what_the_grammar_cannot_settle(self):
+        self.assertEqual(parse('Finish slides eod')['confidence_score'], 80)  # no category
+        self.assertEqual(parse('Email client on 2024-03-20 and 3/21')['confidence_score'], 50)  # two dates
+        self.assertEqual(parse('Meet Anna sometime next weekend')['confidence_score'], 30)  # vague date
+        self.assertEqual(parse('tomorrow 5pm')['confidence_score'], 30)  # no title
+        self.assertEqual(parse('report due 2024-02-30')['confidence_score'], 50)  # invalid ISO date left over
+
+
+class MergeParseTests(SimpleTestCase):
+    parsed = parse('Pay rent tomorrow at 5pm !high #finance')
+
+    def test_grammar_fields_win_over_the_model(self):
+        result = {'title': 'Pay the rent', 'due_date': '2024-03-06 09:00', 'priority': 2, 'category': 'home'}
+        merged = AIService._merge_parse('Pay rent tomorrow at 5pm', self.parsed, result, 'llm')
+        self.assertEqual(merged['due_date'], '2024-03-05 17:00')
+        self.assertEqual(merged['priority'], 4)
+        self.assertEqual(merged['category'], 'finance')
+        self.assertEqual(merged['title'], 'Pay the rent')
+        self.assertEqual(merged['source'], 'llm')
+
+    def test_model_fills_what_the_grammar_missed(self):
+        parsed = parse('Meet Anna sometime next weekend')
+        result = {'title': 'Meet Anna', 'description': 'Weekend catch-up', 'due_date': '2024-03-09 23:59',
+                  'priority': 2, 'category': 'personal'}
+        merged = AIService._merge_parse('Meet Anna sometime next weekend', parsed, result, 'llm')
+        self.assertEqual(merged['title'], 'Meet Anna')
+        self.assertEqual(merged['description'], 'Weekend catch-up')
+        self.assertEqual(merged['due_date'], '2024-03-09 23:59')
+        self.assertEqual(merged['priority'], 2)
+        self.assertEqual(merged['category'], 'personal')
+
+    def test_defaults_without_a_model_reply(self):
+        merged = AIService._merge_parse('tomorrow 5pm', parse('tomorrow 5pm'), None, 'fallback')
+        self.assertEqual(merged['title'], 'tomorrow 5pm')
+        self.assertEqual(merged['due_date'], '2024-03-05 17:00')
+        self.assertEqual(merged['priority'], 3)
+        self.assertEqual(merged['category'], 'personal')
+        self.assertEqual(merged['source'], 'fallback')
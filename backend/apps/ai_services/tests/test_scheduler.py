@@ -0,0 +1,125 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.test import SimpleTestCase
+
+from apps.ai_services.scheduler import WorkCalendar, build_schedule
+
+MONDAY = datetime(2024, 3, 4, 9, 0)
+WORK_START, WORK_END, WORK_DAYS = time(9, 0), time(17, 0), [0, 1, 2, 3, 4]
+
+
+def task(task_id, due_date=None, priority=3, estimated_duration=60, dependencies=()):
+    return {
+        'id': task_id, 'title': task_id, 'priority': priority, 'estimated_duration': estimated_duration,
+        'due_date': due_date, 'dependencies': list(dependencies),
+    }
+
+
+def schedule(tasks, start=MONDAY, busy=(), **kwargs):
+    return build_schedule(tasks, start, WORK_START, WORK_END, WORK_DAYS, busy, **kwargs)
+
+
+def order(result):
+    return [entry['id'] for entry in result['schedule']]
+
+
+class EarliestDeadlineFirstTests(SimpleTestCase):
+    def test_earliest_deadline_first_and_undated_last(self):
+        result = schedule([
+            task('later', MONDAY + timedelta(days=4)),
+            task('undated'),
+            task('sooner', MONDAY + timedelta(days=1)),
+        ])
+        self.assertEqual(order(result), ['sooner', 'later', 'undated'])
+        self.assertEqual([entry['suggested_order'] for entry in result['schedule']], [1, 2, 3])
+
+    def test_priority_brings_a_deadline_forward(self):
+        result = schedule([
+            task('low', MONDAY + timedelta(days=1), priority=1),
+            task('high', MONDAY + timedelta(days=2), priority=5),
+        ])
+        # 5 levels pull "high" four days earlier against one for "low"
+        self.assertEqual(order(result), ['high', 'low'])
+
+    def test_priority_breaks_ties_between_undated_tasks(self):
+        self.assertEqual(order(schedule([task('normal'), task('urgent', priority=5)])), ['urgent', 'normal'])
+
+    def test_prerequisites_inherit_the_urgency_of_their_dependents(self):
+        result = schedule([
+            task('other', MONDAY + timedelta(days=2)),
+            task('prerequisite', MONDAY + timedelta(days=10)),
+            task('urgent', MONDAY + timedelta(days=1), dependencies=['prerequisite']),
+        ])
+        self.assertEqual(order(result), ['prerequisite', 'urgent', 'other'])
+
+    def test_dependencies_outside_the_set_do_not_block(self):
+        self.assertEqual(order(schedule([task('a', dependencies=['elsewhere'])])), ['a'])
+
+    def test_dependency_cycle_is_left_unscheduled(self):
+        result = schedule([task('a', dependencies=['b']), task('b', dependencies=['a']), task('c')])
+        self.assertEqual(order(result), ['c'])
+        self.assertEqual([entry['id'] for entry in result['unscheduled']], ['a', 'b'])
+        self.assertEqual(result['unscheduled'][0]['reason'], 'dependency cycle')
+
+    def test_missed_deadlines_are_reported(self):
+        result = schedule([task('tight', MONDAY + timedelta(hours=1), estimated_duration=120)])
+        self.assertEqual(result['infeasible'], [{
+            'id': 'tight', 'title': 'tight', 'due_date': MONDAY + timedelta(hours=1),
+            'estimated_completion_time': MONDAY + timedelta(hours=2), 'late_by_minutes': 60,
+        }])
+
+
+class WorkingHoursTests(SimpleTestCase):
+    def test_tasks_run_back_to_back(self):
+        result = schedule([task('a', estimated_duration=30), task('b', estimated_duration=45)])
+        self.assertEqual(
+            [(entry['estimated_start_time'], entry['estimated_completion_time']) for entry in result['schedule']],
+            [(MONDAY, datetime(2024, 3, 4, 9, 30)), (datetime(2024, 3, 4, 9, 30), datetime(2024, 3, 4, 10, 15))],
+        )
+
+    def test_start_before_working_hours_waits_for_them(self):
+        entry = schedule([task('a')], start=datetime(2024, 3, 4, 7, 0))['schedule'][0]
+        self.assertEqual(entry['estimated_start_time'], MONDAY)
+
+    def test_work_continues_the_next_working_day(self):
+        entry = schedule([task('a', estimated_duration=120)], start=datetime(2024, 3, 4, 16, 0))['schedule'][0]
+        self.assertEqual(entry['estimated_start_time'], datetime(2024, 3, 4, 16, 0))
+        self.assertEqual(entry['estimated_completion_time'], datetime(2024, 3, 5, 10, 0))
+
+    def test_weekends_are_skipped(self):
+        entry = schedule([task('a')], start=datetime(2024, 3, 8, 16, 30))['schedule'][0]  # a Friday
+        self.assertEqual(entry['estimated_completion_time'], datetime(2024, 3, 11, 9, 30))
+
+    def test_fixed_tasks_are_worked_around(self):
+        busy = [(datetime(2024, 3, 4, 10, 0), datetime(2024, 3, 4, 11, 0))]
+        entry = schedule([task('a', estimated_duration=90)], busy=busy)['schedule'][0]
+        self.assertEqual(entry['estimated_start_time'], MONDAY)
+        self.assertEqual(entry['estimated_completion_time'], datetime(2024, 3, 4, 11, 30))
+
+    def test_fixed_task_at_the_start_delays_work(self):
+        busy = [(datetime(2024, 3, 4, 8, 0), datetime(2024, 3, 4, 9, 45))]
+        entry = schedule([task('a', estimated_duration=15)], busy=busy)['schedule'][0]
+        self.assertEqual(entry['estimated_start_time'], datetime(2024, 3, 4, 9, 45))
+
+    def test_no_working_days_raises(self):
+        with self.assertRaises(ValueError):
+            WorkCalendar(MONDAY, WORK_START, WORK_END, []).place(30)
+
+
+class TimeZoneTests(SimpleTestCase):
+    LOS_ANGELES = ZoneInfo('America/Los_Angeles')
+
+    def test_working_hours_follow_the_users_clock(self):
+        # 9:00 in Los Angeles is 17:00 UTC in winter (UTC-8)
+        entry = schedule([task('a', estimated_duration=60)], tz=self.LOS_ANGELES)['schedule'][0]
+        self.assertEqual(entry['estimated_start_time'], datetime(2024, 3, 4, 17, 0))
+        self.assertEqual(entry['estimated_completion_time'], datetime(2024, 3, 4, 18, 0))
+
+    def test_working_day_is_the_local_day(self):
+        # Saturday 00:30 UTC is still Friday 16:30 in Los Angeles
+        entry = schedule([task('a', estimated_duration=60)], start=datetime(2024, 3, 9, 0, 30),
+                         tz=self.LOS_ANGELES)['schedule'][0]
+        self.assertEqual(entry['estimated_start_time'], datetime(2024, 3, 9, 0, 30))
+        # Resumes at 9:00 local on Monday, now UTC-7 after the DST change
+        self.assertEqual(entry['estimated_completion_time'], datetime(2024, 3, 11, 16, 30))
@@ -1,14 +1,19 @@
 from django.urls import path
 from .views import (
-    categorize_task, suggest_priority, parse_natural_language,
-    get_suggestions, optimize_schedule, estimate_duration
+    categorize_task, categorize_batch, suggest_priority, parse_natural_language,
+    get_suggestions, optimize_schedule, estimate_duration, analyze_task, cache_stats,
+    ai_metrics
 )
 
 urlpatterns = [
     path('categorize/', categorize_task, name='categorize-task'),
+    path('categorize-batch/', categorize_batch, name='categorize-batch'),
     path('suggest-priority/', suggest_priority, name='suggest-priority'),
     path('parse-natural/', parse_natural_language, name='parse-natural'),
     path('suggestions/', get_suggestions, name='get-suggestions'),
     path('optimize-schedule/', optimize_schedule, name='optimize-schedule'),
     path('estimate-duration/', estimate_duration, name='estimate-duration'),
+    path('analyze/', analyze_task, name='analyze-task'),
+    path('cache-stats/', cache_stats, name='ai-cache-stats'),
+    path('metrics/', ai_metrics, name='ai-metrics'),
 ] 
\ No newline at end of file
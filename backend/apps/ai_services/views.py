@@ -1,11 +1,46 @@
+from datetime import datetime, timezone
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from .cache import AIResultCache
+from .metrics import metrics
+from .permissions import HasMetricsToken
 from .services import AIService
+from .streaming import event_stream_response, wants_stream
 from apps.tasks.models import Task
 
 
+def parse_request_datetime(value):
+    """Parse a datetime or a date from request data, keeping any offset it carries"""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        parsed = datetime.combine(day, datetime.min.time()) if day else None
+    return parsed
+
+
+def parse_due_date(value):
+    """Parse a due date from request data into a naive local datetime"""
+    due_date = parse_request_datetime(value)
+    if due_date is not None and due_date.tzinfo is not None:
+        due_date = due_date.astimezone().replace(tzinfo=None)
+    return due_date
+
+
+def parse_utc_datetime(value):
+    """Parse a datetime from request data into naive UTC, like the stored due dates; naive input is taken as UTC"""
+    parsed = parse_request_datetime(value)
+    if parsed is not None and parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def categorize_task(request):
@@ -17,18 +52,40 @@ def categorize_task(request):
         return Response({'error': 'Title is required'}, status=status.HTTP_400_BAD_REQUEST)
     
     ai_service = AIService()
-    result = ai_service.categorize_task(title, description)
+    result = ai_service.categorize_task(title, description, user=request.user)
     
     return Response(result)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def categorize_batch(request):
+    """Categorize many tasks in one request"""
+    tasks = request.data.get('tasks', [])
+    
+    if not tasks or not isinstance(tasks, list):
+        return Response({'error': 'tasks is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(tasks) > settings.AI_BATCH_MAX_ITEMS:
+        return Response(
+            {'error': f'At most {settings.AI_BATCH_MAX_ITEMS} tasks per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not all(isinstance(task, dict) for task in tasks):
+        return Response({'error': 'Each task must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    ai_service = AIService()
+    results = ai_service.categorize_batch(tasks, user=request.user)
+    
+    return Response({'results': results})
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def suggest_priority(request):
     """Suggest priority for a task using AI"""
     title = request.data.get('title', '')
     description = request.data.get('description', '')
-    due_date = request.data.get('due_date')
+    due_date = parse_due_date(request.data.get('due_date'))
     
     if not title:
         return Response({'error': 'Title is required'}, status=status.HTTP_400_BAD_REQUEST)
@@ -42,13 +99,15 @@ def suggest_priority(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def parse_natural_language(request):
-    """Parse natural language input to extract task details"""
+    """Parse natural language input to extract task details, as Server-Sent Events with ?stream=true"""
     text = request.data.get('text', '')
     
     if not text:
         return Response({'error': 'Text is required'}, status=status.HTTP_400_BAD_REQUEST)
     
     ai_service = AIService()
+    if wants_stream(request):
+        return event_stream_response(ai_service.stream_natural_language(text))
     result = ai_service.parse_natural_language(text)
     
     return Response(result)
@@ -57,59 +116,63 @@ def parse_natural_language(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_suggestions(request):
-    """Get AI-powered task suggestions"""
-    # Get user's recent tasks
-    user_tasks = Task.objects.filter(user=request.user).order_by('-created_at')[:50]
-    
-    # Convert to list of dictionaries
-    tasks_data = []
-    for task in user_tasks:
-        tasks_data.append({
-            'title': task.title,
-            'description': task.description,
-            'category': task.category,
-            'priority': task.priority,
-            'status': task.status,
-            'estimated_duration': task.estimated_duration,
-            'due_date': task.due_date,
-        })
-    
+    """Get AI-powered task suggestions, as Server-Sent Events with ?stream=true"""
     ai_service = AIService()
-    suggestions = ai_service.get_task_suggestions(tasks_data)
+    suggestions = ai_service.get_task_suggestions(request.user)
     
+    if wants_stream(request):
+        return event_stream_response(
+            [*(('suggestion', suggestion) for suggestion in suggestions), ('result', {'suggestions': suggestions})]
+        )
     return Response({'suggestions': suggestions})
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def optimize_schedule(request):
-    """Optimize task schedule"""
+    """Optimize task schedule.
+
+    Optional: ``fixed_task_ids`` (tasks pinned at their due date),
+    ``start``, ``work_start``/``work_end`` (``HH:MM``) and ``work_days``
+    (0 is Monday), in the user's time zone.
+    """
     task_ids = request.data.get('task_ids', [])
     
     if not task_ids:
         return Response({'error': 'task_ids is required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Get tasks
-    tasks = Task.objects.filter(user=request.user, id__in=task_ids)
-    
-    # Convert to list of dictionaries
-    tasks_data = []
-    for task in tasks:
-        tasks_data.append({
-            'id': str(task.id),
-            'title': task.title,
-            'description': task.description,
-            'category': task.category,
-            'priority': task.priority,
-            'status': task.status,
-            'estimated_duration': task.estimated_duration,
-            'due_date': task.due_date,
-        })
+    fields = ('id', 'title', 'category', 'priority', 'status', 'estimated_duration', 'due_date', 'dependencies')
     
-    ai_service = AIService()
-    optimized_schedule = ai_service.optimize_schedule(tasks_data)
+    def load(ids):
+        rows = Task.objects.filter(user=request.user, id__in=ids, status__ne='completed').only(*fields).as_pymongo()
+        return [
+            {
+                **{field: row.get(field) for field in fields if field not in ('id', 'dependencies')},
+                'id': str(row['_id']),
+                'dependencies': [str(dependency) for dependency in row.get('dependencies', [])],
+            }
+            for row in rows
+        ]
     
-    return Response({'optimized_schedule': optimized_schedule})
+    ai_service = AIService()
+    try:
+        result = ai_service.optimize_schedule(
+            load(task_ids),
+            fixed_tasks=load(request.data.get('fixed_task_ids', [])),
+            start=parse_utc_datetime(request.data.get('start')),
+            work_start=request.data.get('work_start'),
+            work_end=request.data.get('work_end'),
+            work_days=request.data.get('work_days'),
+            tz=request.user.timezone,
+        )
+    except (TypeError, ValueError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'optimized_schedule': result['schedule'],
+        'infeasible': result['infeasible'],
+        'unscheduled': result['unscheduled'],
+    })
 
 
 @api_view(['POST'])
@@ -125,4 +188,35 @@ def estimate_duration(request):
     ai_service = AIService()
     duration = ai_service.estimate_duration(title, description)
     
-    return Response({'estimated_duration': duration}) 
\ No newline at end of file
+    return Response({'estimated_duration': duration})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def analyze_task(request):
+    """Get category, priority, duration and complexity in one AI call"""
+    title = request.data.get('title', '')
+    description = request.data.get('description', '')
+    due_date = parse_due_date(request.data.get('due_date'))
+    
+    if not title:
+        return Response({'error': 'Title is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    ai_service = AIService()
+    result = ai_service.analyze_task(title, description, due_date)
+    
+    return Response(result)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser | HasMetricsToken])
+def cache_stats(request):
+    """Get AI result cache hit/miss counters"""
+    return Response(AIResultCache().stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser | HasMetricsToken])
+def ai_metrics(request):
+    """AIService latency, token, cost, error and source metrics in Prometheus text format"""
+    return HttpResponse(metrics.render(AIService.MODEL), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.models import TaskRollup
+from apps.authentication.models import User
+
+
+def counts(rollup):
+    """A rollup's counters without bookkeeping fields and zeroed keys, for comparison"""
+    return {
+        field: {key: count for key, count in value.items() if count} if isinstance(value, dict) else value
+        for field, value in rollup.items() if field not in ('_id', 'updated_at')
+    }
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user task rollups behind productivity metrics from the tasks themselves'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the rollup of this username')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(username=options['user']) if options['user'] else User.objects.all()
+        rebuilt = 0
+        drifted = 0
+        for user in users.only('id'):
+            previous = TaskRollup._get_collection().find_one({'user': user.pk})
+            rollup = TaskRollup.rebuild(user)
+            if previous is not None and counts(previous) != counts(rollup):
+                drifted += 1
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'{rebuilt} task rollups rebuilt, {drifted} had drifted'))
@@ -0,0 +1,121 @@
+from collections import Counter
+from datetime import datetime
+
+from mongoengine import Document, ReferenceField, DictField, IntField, DateTimeField
+from apps.authentication.models import User
+from apps.tasks.models import Task
+
+# Task fields the rollup is computed from
+ROLLUP_FIELDS = ('status', 'priority', 'category', 'estimated_duration')
+
+
+def category_key(category):
+    """Category name as a field name MongoDB accepts: dots and a leading $ become their fullwidth forms"""
+    key = (category or 'uncategorized').replace('.', '\uff0e')
+    return '\uff04' + key[1:] if key.startswith('$') else key
+
+
+def category_name(key):
+    return key.replace('\uff0e', '.').replace('\uff04', '$')
+
+
+def increments(row, count=1):
+    """The ``$inc`` paths ``count`` tasks like ``row`` (a dict with ``ROLLUP_FIELDS``) add to a rollup"""
+    status = row.get('status') or 'pending'
+    result = Counter({
+        'total': count,
+        f'status_counts.{status}': count,
+        f"priority_counts.{row.get('priority')}": count,
+        f"category_counts.{category_key(row.get('category'))}": count,
+    })
+    duration = row.get('estimated_duration') or 0
+    if duration > 0:
+        result[f'duration_sums.{status}'] += count * duration
+        result[f'duration_counts.{status}'] += count
+    return result
+
+
+class TaskRollup(Document):
+    """Per-user task counts, kept current at write time.
+
+    Every task create, update and delete applies its difference with one
+    ``$inc``, so dashboards read a single document instead of scanning the
+    user's tasks. ``duration_sums``/``duration_counts`` cover the tasks with
+    an estimated duration, by status. A missing rollup is rebuilt from the
+    tasks on first use; ``reconcile_task_rollups`` rebuilds them all.
+    """
+    user = ReferenceField(User, required=True)
+    total = IntField(default=0)
+    status_counts = DictField(default={})
+    priority_counts = DictField(default={})  # "1" .. "5" -> tasks
+    category_counts = DictField(default={})  # category_key(category) -> tasks
+    duration_sums = DictField(default={})  # status -> estimated minutes
+    duration_counts = DictField(default={})  # status -> tasks with an estimate
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'task_rollups',
+        'indexes': [
+            {'fields': ['user'], 'unique': True},
+        ]
+    }
+
+    @classmethod
+    def apply(cls, user, added=(), removed=()):
+        """Fold tasks written (``added``) and their previous state or deletion (``removed``) into the rollup.
+
+        Call after the task write, so rebuilding a missing rollup already
+        includes it. ``user`` may be a User or its id.
+        """
+        user_id = getattr(user, 'pk', user)
+        total = Counter()
+        for row in added:
+            total.update(increments(row))
+        for row in removed:
+            total.update(increments(row, -1))
+        update = {path: amount for path, amount in total.items() if amount}
+        if not update:
+            return
+        result = cls._get_collection().update_one(
+            {'user': user_id},
+            {'$inc': update, '$set': {'updated_at': datetime.utcnow()}},
+        )
+        if not result.matched_count:
+            cls.rebuild(user_id)
+
+    @classmethod
+    def rebuild(cls, user):
+        """Recount ``user``'s rollup from their tasks with one grouped aggregation and return it"""
+        user_id = getattr(user, 'pk', user)
+        groups = Task._get_collection().aggregate([
+            {'$match': {'user': user_id}},
+            {'$group': {
+                '_id': {'status': '$status', 'priority': '$priority', 'category': '$category'},
+                'count': {'$sum': 1},
+                'duration': {'$sum': {'$cond': [{'$gt': ['$estimated_duration', 0]}, '$estimated_duration', 0]}},
+                'timed': {'$sum': {'$cond': [{'$gt': ['$estimated_duration', 0]}, 1, 0]}},
+            }},
+        ])
+        rollup = {
+            'user': user_id, 'total': 0, 'status_counts': {}, 'priority_counts': {}, 'category_counts': {},
+            'duration_sums': {}, 'duration_counts': {}, 'updated_at': datetime.utcnow(),
+        }
+        for group in groups:
+            row = group['_id']
+            for path, amount in increments({**row, 'estimated_duration': 0}, group['count']).items():
+                field, _, key = path.partition('.')
+                if key:
+                    rollup[field][key] = rollup[field].get(key, 0) + amount
+                else:
+                    rollup[field] += amount
+            if group['timed']:
+                status = row.get('status') or 'pending'
+                rollup['duration_sums'][status] = rollup['duration_sums'].get(status, 0) + group['duration']
+                rollup['duration_counts'][status] = rollup['duration_counts'].get(status, 0) + group['timed']
+        cls._get_collection().replace_one({'user': user_id}, rollup, upsert=True)
+        return rollup
+
+    @classmethod
+    def for_user(cls, user):
+        """The raw rollup document of ``user``, rebuilt first if it does not exist yet"""
+        return cls._get_collection().find_one({'user': user.pk}) or cls.rebuild(user)
@@ -2,79 +2,69 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from apps.ai_services.streaming import event_stream_response, wants_stream
+from apps.analytics.models import TaskRollup, category_name
 from apps.tasks.models import Task
 from datetime import datetime, timedelta
 
+# $dayOfWeek numbers, in Monday-first display order
+DAY_NAMES = {2: 'Monday', 3: 'Tuesday', 4: 'Wednesday', 5: 'Thursday', 6: 'Friday', 7: 'Saturday', 1: 'Sunday'}
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def productivity_metrics(request):
-    """Get productivity metrics for the user"""
-    user_tasks = Task.objects.filter(user=request.user)
+    """Get productivity metrics for the user, read from their task rollup"""
+    rollup = TaskRollup.for_user(request.user)
+    status_counts = rollup['status_counts']
     
-    # Calculate metrics
-    total_tasks = user_tasks.count()
-    completed_tasks = user_tasks.filter(status='completed').count()
-    pending_tasks = user_tasks.filter(status='pending').count()
-    in_progress_tasks = user_tasks.filter(status='in_progress').count()
+    total_tasks = rollup['total']
+    completed_tasks = status_counts.get('completed', 0)
     
     # Completion rate
     completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
     
     # Average completion time
-    completed_tasks_with_duration = user_tasks.filter(status='completed', estimated_duration__gt=0)
+    completed_with_duration = rollup['duration_counts'].get('completed', 0)
     avg_completion_time = 0
-    if completed_tasks_with_duration.count() > 0:
-        total_duration = sum(task.estimated_duration for task in completed_tasks_with_duration)
-        avg_completion_time = total_duration / completed_tasks_with_duration.count()
-    
-    # Tasks by priority
-    priority_breakdown = {}
-    for priority in range(1, 6):
-        priority_breakdown[f'priority_{priority}'] = user_tasks.filter(priority=priority).count()
-    
-    # Tasks by category
-    category_breakdown = {}
-    for task in user_tasks:
-        category = task.category or 'uncategorized'
-        if category not in category_breakdown:
-            category_breakdown[category] = 0
-        category_breakdown[category] += 1
+    if completed_with_duration > 0:
+        avg_completion_time = rollup['duration_sums'].get('completed', 0) / completed_with_duration
     
     return Response({
         'total_tasks': total_tasks,
         'completed_tasks': completed_tasks,
-        'pending_tasks': pending_tasks,
-        'in_progress_tasks': in_progress_tasks,
+        'pending_tasks': status_counts.get('pending', 0),
+        'in_progress_tasks': status_counts.get('in_progress', 0),
         'completion_rate': round(completion_rate, 2),
         'avg_completion_time': round(avg_completion_time, 2),
-        'priority_breakdown': priority_breakdown,
-        'category_breakdown': category_breakdown,
+        'priority_breakdown': {
+            f'priority_{priority}': rollup['priority_counts'].get(str(priority), 0) for priority in range(1, 6)
+        },
+        'category_breakdown': {
+            category_name(key): count for key, count in rollup['category_counts'].items() if count
+        },
     })
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def usage_patterns(request):
-    """Get usage patterns for the user"""
-    user_tasks = Task.objects.filter(user=request.user)
+    """Get usage patterns for the user, bucketed in their time zone"""
+    timezone = request.user.timezone or 'UTC'
+    user_tasks = Task.objects.filter(user=request.user).order_by()
     
     # Tasks created by day of week
-    day_of_week_pattern = {}
-    for task in user_tasks:
-        day = task.created_at.strftime('%A')
-        if day not in day_of_week_pattern:
-            day_of_week_pattern[day] = 0
-        day_of_week_pattern[day] += 1
-    
-    # Tasks completed by hour of day
-    hour_of_day_pattern = {}
-    completed_tasks = user_tasks.filter(status='completed')
-    for task in completed_tasks:
-        hour = task.updated_at.hour
-        if hour not in hour_of_day_pattern:
-            hour_of_day_pattern[hour] = 0
-        hour_of_day_pattern[hour] += 1
+    created = user_tasks.aggregate([
+        {'$group': {'_id': {'$dayOfWeek': {'date': '$created_at', 'timezone': timezone}}, 'count': {'$sum': 1}}},
+    ])
+    days = {row['_id']: row['count'] for row in created}
+    day_of_week_pattern = {name: days[day] for day, name in DAY_NAMES.items() if day in days}
+    
+    # Tasks completed by hour of day, matched on the (user, status) index
+    completed = user_tasks.filter(status='completed').aggregate([
+        {'$group': {'_id': {'$hour': {'date': '$updated_at', 'timezone': timezone}}, 'count': {'$sum': 1}}},
+    ])
+    hour_of_day_pattern = {row['_id']: row['count'] for row in sorted(completed, key=lambda row: row['_id'])}
     
     # Most productive hours
     most_productive_hours = sorted(hour_of_day_pattern.items(), key=lambda x: x[1], reverse=True)[:3]
@@ -83,30 +73,27 @@ def usage_patterns(request):
         'day_of_week_pattern': day_of_week_pattern,
         'hour_of_day_pattern': hour_of_day_pattern,
         'most_productive_hours': most_productive_hours,
+        'timezone': timezone,
     })
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def ai_insights(request):
-    """Get AI-generated insights"""
-    user_tasks = Task.objects.filter(user=request.user)
-    
-    insights = []
+def generate_insights(user):
+    """Yield insights one at a time, each as soon as its query finishes"""
+    user_tasks = Task.objects.filter(user=user)
     
     # Analyze completion patterns
     completed_tasks = user_tasks.filter(status='completed')
     if completed_tasks.count() > 0:
         avg_priority = sum(task.priority for task in completed_tasks) / completed_tasks.count()
         if avg_priority > 4:
-            insights.append("You tend to complete high-priority tasks effectively. Consider focusing on medium-priority tasks to improve overall productivity.")
+            yield "You tend to complete high-priority tasks effectively. Consider focusing on medium-priority tasks to improve overall productivity."
         elif avg_priority < 2:
-            insights.append("You often complete low-priority tasks. Try to prioritize important tasks to maximize your productivity.")
+            yield "You often complete low-priority tasks. Try to prioritize important tasks to maximize your productivity."
     
     # Analyze overdue tasks
     overdue_tasks = [task for task in user_tasks if task.is_overdue]
     if overdue_tasks:
-        insights.append(f"You have {len(overdue_tasks)} overdue tasks. Consider reviewing and reprioritizing them.")
+        yield f"You have {len(overdue_tasks)} overdue tasks. Consider reviewing and reprioritizing them."
     
     # Analyze category distribution
     categories = {}
@@ -118,16 +105,34 @@ def ai_insights(request):
     
     if categories:
         most_common_category = max(categories.items(), key=lambda x: x[1])[0]
-        insights.append(f"Your most common task category is '{most_common_category}'. Consider diversifying your task types for better work-life balance.")
+        yield f"Your most common task category is '{most_common_category}'. Consider diversifying your task types for better work-life balance."
     
     # Analyze task duration
     tasks_with_duration = user_tasks.filter(estimated_duration__gt=0)
     if tasks_with_duration.count() > 0:
         avg_duration = sum(task.estimated_duration for task in tasks_with_duration) / tasks_with_duration.count()
         if avg_duration > 120:
-            insights.append("Your tasks tend to be long-duration. Consider breaking them down into smaller, more manageable tasks.")
+            yield "Your tasks tend to be long-duration. Consider breaking them down into smaller, more manageable tasks."
         elif avg_duration < 30:
-            insights.append("Your tasks are typically short. Consider batching similar tasks together for better efficiency.")
+            yield "Your tasks are typically short. Consider batching similar tasks together for better efficiency."
+
+
+def stream_insights(user):
+    insights = []
+    for insight in generate_insights(user):
+        insights.append(insight)
+        yield 'insight', {'insight': insight}
+    yield 'result', {'insights': insights, 'total_insights': len(insights)}
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def ai_insights(request):
+    """Get AI-generated insights, as Server-Sent Events with ?stream=true"""
+    if wants_stream(request):
+        return event_stream_response(stream_insights(request.user))
+    
+    insights = list(generate_insights(request.user))
     
     return Response({
         'insights': insights,
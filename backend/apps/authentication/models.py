@@ -16,6 +16,7 @@ class User(Document):
     is_superuser = BooleanField(default=False)
     date_joined = DateTimeField(default=datetime.utcnow)
     last_login = DateTimeField()
+    timezone = StringField(max_length=64, default='UTC')  # IANA name, e.g. "Europe/Berlin"
     
     meta = {
         'collection': 'users',
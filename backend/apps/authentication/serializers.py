@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from zoneinfo import available_timezones
 from .models import User
 
 
@@ -58,11 +59,18 @@ class UserProfileSerializer(serializers.Serializer):
     email = serializers.EmailField(read_only=True)
     first_name = serializers.CharField(max_length=30, required=False)
     last_name = serializers.CharField(max_length=30, required=False)
+    timezone = serializers.CharField(max_length=64, required=False)
     date_joined = serializers.DateTimeField(read_only=True)
     last_login = serializers.DateTimeField(read_only=True)
     
+    def validate_timezone(self, value):
+        if value not in available_timezones():
+            raise serializers.ValidationError(f"Unknown time zone: {value}")
+        return value
+    
     def update(self, instance, validated_data):
         instance.first_name = validated_data.get('first_name', instance.first_name)
         instance.last_name = validated_data.get('last_name', instance.last_name)
+        instance.timezone = validated_data.get('timezone', instance.timezone)
         instance.save()
         return instance 
\ No newline at end of file
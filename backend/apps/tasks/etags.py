@@ -0,0 +1,52 @@
+import hashlib
+from datetime import datetime
+
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+
+from .models import Task
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/{quote_etag(digest)}'
+
+
+def task_list_etag(request):
+    """Weak ETag for a task listing from the user's watermark.
+
+    The watermark is the latest ``updated_at`` plus the task count, which
+    changes on every create, update and delete. The query string is part of
+    the tag because filters and pages are separate representations. The
+    number of overdue tasks is too, so a listing revalidates as soon as a
+    deadline passes and ``is_overdue`` flips without any write, and so is
+    the current UTC date, which rolls ``days_until_due`` over.
+    """
+    tasks = Task.objects.filter(user=request.user)
+    latest = tasks.order_by('-updated_at').only('updated_at').as_pymongo().first()
+    watermark = latest['updated_at'].isoformat() if latest else ''
+    now = datetime.utcnow()
+    overdue = tasks.filter(status__ne='completed', due_date__lt=now).count()
+    return make_etag(request.user.pk, watermark, tasks.count(), overdue, now.date(), request.get_full_path())
+
+
+def task_etag(task):
+    return make_etag(task.pk, task.updated_at.isoformat() if task.updated_at else '')
+
+
+def etag_matches(request, etag):
+    """Weak comparison of ``etag`` against the request's If-None-Match header"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    if '*' in candidates:
+        return True
+    return any(candidate.removeprefix('W/') == etag.removeprefix('W/') for candidate in candidates)
+
+
+def set_etag(response, etag):
+    response['ETag'] = etag
+    # Let browsers keep the body and revalidate it with If-None-Match
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,62 @@
+import re
+
+from mongoengine.errors import ValidationError as MongoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, SearchFilter
+
+from .models import Task, title_tokens
+from .pagination import TaskPagination
+
+
+class TaskFilterBackend(BaseFilterBackend):
+    """Exact-match filtering on the view's ``filterset_fields`` for MongoEngine querysets"""
+
+    def filter_queryset(self, request, queryset, view):
+        filters = {}
+        for field_name in getattr(view, 'filterset_fields', []):
+            value = request.query_params.get(field_name)
+            if value in (None, ''):
+                continue
+            field = Task._fields[field_name]
+            try:
+                value = field.to_python(value)
+                field.validate(value)
+            except (MongoValidationError, ValueError, TypeError):
+                raise ValidationError({field_name: [f'Invalid value: {value}']})
+            filters[field_name] = value
+        return queryset.filter(**filters)
+
+
+class TaskSearchFilter(SearchFilter):
+    """Full-text task search backed by the ``(user, text)`` index on Task.
+
+    Words are matched against the text index over title, description and
+    tags and results are ranked by text score. The last word is also
+    matched as a prefix of any title word through the ``(user,
+    title_tokens)`` index, so results show up while the user is still
+    typing. An explicit ``ordering`` parameter takes precedence over
+    relevance ranking. Keyset pages cannot seek on a text score, so a
+    search with ``cursor`` must also pass ``ordering``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search = request.query_params.get(self.search_param, '').strip()
+        if not search:
+            return queryset
+
+        ordered = bool(request.query_params.get('ordering'))
+        if TaskPagination.cursor_query_param in request.query_params and not ordered:
+            raise ValidationError({
+                TaskPagination.cursor_query_param: ['Pass ordering to page search results with a cursor.']
+            })
+
+        user_id = request.user.pk
+        prefix = re.escape(title_tokens(search)[-1])
+        queryset = queryset.filter(__raw__={'$or': [
+            {'user': user_id, '$text': {'$search': search}},
+            {'user': user_id, 'title_tokens': {'$regex': f'^{prefix}'}},
+        ]})
+
+        if ordered:
+            return queryset
+        return queryset.order_by('$text_score', '-created_at')
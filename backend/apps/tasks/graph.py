@@ -0,0 +1,105 @@
+from collections import deque
+
+from .models import Task
+
+
+class DependencyGraph:
+    """In-memory dependency graph of a user's tasks.
+
+    All edges are loaded with one projected query, so cycle checks,
+    topological ordering, blocked/unblocked sets and the critical path are
+    computed in O(V + E) without dereferencing ``Task.dependencies`` one
+    document at a time.
+    """
+    projection = {'title': 1, 'status': 1, 'estimated_duration': 1, 'dependencies': 1}
+
+    def __init__(self, rows):
+        self.nodes = {}
+        self.dependencies = {}
+        for row in rows:
+            self.nodes[row['_id']] = row
+        # Edges to tasks that no longer exist (or belong to someone else) are dropped
+        for task_id, row in self.nodes.items():
+            self.dependencies[task_id] = [dep for dep in row.get('dependencies') or [] if dep in self.nodes]
+        self.dependents = {task_id: [] for task_id in self.nodes}
+        for task_id, deps in self.dependencies.items():
+            for dep in deps:
+                self.dependents[dep].append(task_id)
+
+    @classmethod
+    def for_user(cls, user):
+        return cls(Task._get_collection().find({'user': user.pk}, cls.projection))
+
+    def is_completed(self, task_id):
+        return self.nodes[task_id].get('status') == 'completed'
+
+    def creates_cycle(self, task_id, dependency_ids):
+        """Return True if making ``task_id`` depend on ``dependency_ids`` closes a cycle"""
+        stack = list(dependency_ids)
+        seen = set()
+        while stack:
+            current = stack.pop()
+            if current == task_id:
+                return True
+            if current in seen:
+                continue
+            seen.add(current)
+            stack.extend(self.dependencies.get(current, []))
+        return False
+
+    def topological_order(self):
+        """Return ``(order, cyclic)``: dependencies first, plus any tasks left on a cycle"""
+        in_degree = {task_id: len(deps) for task_id, deps in self.dependencies.items()}
+        queue = deque(task_id for task_id, degree in in_degree.items() if degree == 0)
+        order = []
+        while queue:
+            task_id = queue.popleft()
+            order.append(task_id)
+            for dependent in self.dependents[task_id]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    queue.append(dependent)
+        placed = set(order)
+        cyclic = [task_id for task_id in self.nodes if task_id not in placed]
+        return order, cyclic
+
+    def blocked_and_unblocked(self):
+        """Split open tasks by whether any of their dependencies is still open"""
+        blocked, unblocked = [], []
+        for task_id, deps in self.dependencies.items():
+            if self.is_completed(task_id):
+                continue
+            if any(not self.is_completed(dep) for dep in deps):
+                blocked.append(task_id)
+            else:
+                unblocked.append(task_id)
+        return blocked, unblocked
+
+    def critical_path(self):
+        """Return ``(path, total_minutes)`` for the longest chain of open work"""
+        order, _ = self.topological_order()
+        finish = {}
+        previous = {}
+        for task_id in order:
+            if self.is_completed(task_id):
+                continue
+            start, before = 0, None
+            for dep in self.dependencies[task_id]:
+                if dep in finish and finish[dep] > start:
+                    start, before = finish[dep], dep
+            finish[task_id] = start + (self.nodes[task_id].get('estimated_duration') or 0)
+            previous[task_id] = before
+
+        if not finish:
+            return [], 0
+        current = max(finish, key=finish.get)
+        total = finish[current]
+        path = []
+        while current is not None:
+            path.append(current)
+            current = previous[current]
+        path.reverse()
+        return path, total
+
+    def describe(self, task_ids):
+        return [{'id': str(task_id), 'title': self.nodes[task_id].get('title')} for task_id in task_ids]
@@ -0,0 +1,41 @@
+from datetime import datetime
+from .models import TaskTombstone
+from apps.ai_services.classifier import CategoryClassifier, learned_examples
+from apps.ai_services.habits import HabitMiner, observation
+from apps.analytics.models import TaskRollup
+
+
+def on_tasks_written(user, before=(), after=()):
+    """Update everything derived from ``user``'s tasks after a write.
+
+    ``before`` holds the raw rows (``to_mongo()`` or ``as_pymongo()``) of
+    the written tasks as they were, ``after`` as they are now: a created
+    task is only in ``after``, a deleted one only in ``before``. Rows carry
+    ``_id`` and whichever of the title, description, ``ai_metadata``,
+    ``ROLLUP_FIELDS`` and timestamps the write could have changed. Records
+    deletion tombstones, retrains the category classifier, folds habit
+    observations and applies the analytics rollup. Call after the write.
+    """
+    if not before and not after:
+        return
+    previous = {row.get('_id'): row for row in before}
+    remaining = {row.get('_id') for row in after}
+    created = [row for row in after if row.get('_id') not in previous]
+    completed = [
+        row for row in after
+        if row.get('_id') in previous and row.get('status') == 'completed'
+        and previous[row.get('_id')].get('status') != 'completed'
+    ]
+    deleted = [row for row in before if row.get('_id') not in remaining]
+    now = datetime.utcnow()
+
+    TaskTombstone.record(user, [row['_id'] for row in deleted])
+    TaskRollup.apply(user, added=after, removed=before)
+    # Unchanged examples cancel out, so untouched tasks cost no classifier write
+    CategoryClassifier.learn(user, learned_examples(after), forget=learned_examples(before))
+    HabitMiner.observe(
+        user,
+        created=[observation(row) for row in created],
+        completed=[observation(row, row.get('updated_at') or now) for row in completed],
+        deleted=[observation(row, now) for row in deleted if row.get('status') != 'completed'],
+    )
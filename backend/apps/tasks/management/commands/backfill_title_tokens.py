@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from apps.tasks.models import Task, title_tokens
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Fill title_tokens on tasks written before search matched title prefixes through it'
+
+    def handle(self, *args, **options):
+        collection = Task._get_collection()
+        rows = collection.find({'title_tokens': {'$exists': False}}, {'title': 1})
+        updated = 0
+        batch = []
+        for row in rows:
+            batch.append(UpdateOne({'_id': row['_id']}, {'$set': {'title_tokens': title_tokens(row.get('title'))}}))
+            if len(batch) >= BATCH_SIZE:
+                updated += collection.bulk_write(batch, ordered=False).modified_count
+                batch = []
+        if batch:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+        self.stdout.write(self.style.SUCCESS(f'title_tokens filled on {updated} tasks'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.tasks.recurrence import materialize_recurring_tasks
+
+
+class Command(BaseCommand):
+    help = 'Materialize upcoming occurrences of recurring tasks within the rolling window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-days', type=int, help='Override RECURRENCE_WINDOW_DAYS')
+
+    def handle(self, *args, **options):
+        created = materialize_recurring_tasks(window_days=options['window_days'])
+        self.stdout.write(self.style.SUCCESS(f'{created} recurring task occurrences created'))
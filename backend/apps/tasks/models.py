@@ -1,11 +1,18 @@
-from mongoengine import Document, StringField, DateTimeField, IntField, ListField, ReferenceField, BooleanField, DictField
+from django.conf import settings
+from mongoengine import Document, StringField, DateTimeField, IntField, ListField, ReferenceField, LazyReferenceField, BooleanField, DictField, ObjectIdField
 from datetime import datetime
 from apps.authentication.models import User
 
 
+def title_tokens(title):
+    """Distinct lowercase words of a title, which the search prefix is matched against"""
+    return list(dict.fromkeys((title or '').lower().split()))
+
+
 class Task(Document):
     """Task model for MongoDB using MongoEngine"""
     title = StringField(required=True, max_length=200)
+    title_tokens = ListField(StringField(), default=[])  # title_tokens(title), kept in clean()
     description = StringField(max_length=1000)
     category = StringField(max_length=50, default='personal')
     priority = IntField(min_value=1, max_value=5, default=3)
@@ -24,10 +31,12 @@ class Task(Document):
     
     # Additional fields
     tags = ListField(StringField(max_length=50), default=[])
-    dependencies = ListField(ReferenceField('self'), default=[])
+    dependencies = ListField(LazyReferenceField('self'), default=[])  # not dereferenced on access
     attachments = ListField(StringField(), default=[])
     is_recurring = BooleanField(default=False)
-    recurrence_pattern = StringField(max_length=100)  # e.g., "daily", "weekly", "monthly"
+    recurrence_pattern = StringField(max_length=100)  # e.g., "daily", "weekly", "monthly", "FREQ=WEEKLY;BYDAY=MO"
+    recurrence_parent = LazyReferenceField('self')  # set on materialized occurrences
+    recurrence_watermark = DateTimeField()  # last occurrence materialized for this series
     
     meta = {
         'collection': 'tasks',
@@ -37,8 +46,29 @@ class Task(Document):
             'category',
             'due_date',
             ('user', 'status'),
+            ('user', 'status', 'due_date'),  # overdue count in the listing ETag
             ('user', 'category'),
-            ('user', 'due_date'),
+            ('user', '-updated_at'),  # per-user change watermark
+            ('user', 'updated_at', 'id'),  # delta sync walks (updated_at, _id)
+            # Keyset pagination seeks on (ordering field, _id) per user
+            ('user', '-created_at', '-id'),
+            ('user', 'due_date', 'id'),
+            ('user', 'priority', 'id'),
+            ('user', 'title', 'id'),
+            # Recurring series lookup and one occurrence per series and date
+            ('is_recurring', 'recurrence_watermark'),
+            {
+                'fields': ['recurrence_parent', 'due_date'],
+                'unique': True,
+                'partialFilterExpression': {'recurrence_parent': {'$exists': True}},
+            },
+            ('user', 'title_tokens'),  # search-as-you-type prefix of a title word
+            # Per-user full-text search over title, description and tags
+            {
+                'fields': ['user', '$title', '$description', '$tags'],
+                'default_language': 'english',
+                'weights': {'title': 10, 'tags': 5, 'description': 1},
+            },
         ],
         'ordering': ['-created_at']
     }
@@ -46,6 +76,9 @@ class Task(Document):
     def __str__(self):
         return self.title
     
+    def clean(self):
+        self.title_tokens = title_tokens(self.title)
+    
     def save(self, *args, **kwargs):
         self.updated_at = datetime.utcnow()
         return super().save(*args, **kwargs)
@@ -61,4 +94,29 @@ class Task(Document):
         if self.due_date:
             delta = self.due_date - datetime.utcnow()
             return delta.days
-        return None 
\ No newline at end of file
+        return None
+
+
+class TaskTombstone(Document):
+    """Marker left behind by a deleted task so delta sync can report it"""
+    user = ReferenceField(User, required=True)
+    task_id = ObjectIdField(required=True)
+    deleted_at = DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'task_tombstones',
+        'indexes': [
+            ('user', 'deleted_at'),
+            {'fields': ['deleted_at'], 'expireAfterSeconds': settings.SYNC_TOMBSTONE_TTL_DAYS * 24 * 60 * 60},
+        ]
+    }
+    
+    @classmethod
+    def record(cls, user, task_ids):
+        """Insert one tombstone per deleted task id in a single write"""
+        if not task_ids:
+            return
+        deleted_at = datetime.utcnow()
+        cls._get_collection().insert_many([
+            cls(user=user, task_id=task_id, deleted_at=deleted_at).to_mongo() for task_id in task_ids
+        ])
@@ -0,0 +1,137 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine.fields import DateTimeField
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import Task
+
+
+class TaskPagination(PageNumberPagination):
+    """Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Passing ``?cursor=`` (empty for the first page) switches to keyset
+    pagination: pages are fetched by seeking on ``(ordering field, _id)``
+    instead of ``skip(n)``, so latency does not grow with page depth and
+    rows do not shift when tasks are inserted while paging.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.use_cursor = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.use_cursor = True
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+        position = self.decode_cursor(request)
+        reverse = bool(position and position['r'])
+
+        # Walking backwards flips the sort; the page is re-reversed below.
+        descending = self.descending != reverse
+        if position:
+            queryset = queryset.filter(__raw__=self.seek_query(position['v'], position['id'], descending))
+        queryset = queryset.order_by(
+            f"{'-' if descending else '+'}{self.field}",
+            f"{'-' if descending else '+'}id",
+        )
+
+        rows = list(queryset.limit(self.page_size + 1))
+        has_more = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        if reverse:
+            page.reverse()
+
+        self.next_position = self.previous_position = None
+        if page:
+            if has_more or reverse:
+                self.next_position = self.position_for(page[-1], reverse=False)
+            if position and (has_more or not reverse):
+                self.previous_position = self.position_for(page[0], reverse=True)
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.encode_cursor(self.next_position),
+            'previous': self.encode_cursor(self.previous_position),
+            'results': data,
+        })
+
+    def get_ordering(self, request, queryset, view):
+        """Return the single ``(field, descending)`` pair the keyset seeks on"""
+        ordering = OrderingFilter().get_ordering(request, queryset, view) or ['-created_at']
+        field = ordering[0]
+        return field.lstrip('-'), field.startswith('-')
+
+    def seek_query(self, value, last_id, descending):
+        """Build the raw filter for rows strictly after ``(value, last_id)``.
+
+        MongoDB sorts nulls before every other value, so rows with a null
+        ordering field come last when descending and first when ascending.
+        """
+        field = self.field
+        op = '$lt' if descending else '$gt'
+        tie = {field: value, '_id': {op: last_id}}
+        if value is None:
+            if descending:
+                return tie
+            return {'$or': [tie, {field: {'$ne': None}}]}
+        clauses = [{field: {op: value}}, tie]
+        if descending:
+            clauses.append({field: None})
+        return {'$or': clauses}
+
+    def position_for(self, task, reverse):
+        if isinstance(task, dict):
+            return {'v': task.get(self.field), 'id': task['_id'], 'r': reverse}
+        return {'v': getattr(task, self.field), 'id': task.pk, 'r': reverse}
+
+    def encode_cursor(self, position):
+        if position is None:
+            return None
+        value = position['v']
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        payload = json.dumps({
+            'o': f"{'-' if self.descending else ''}{self.field}",
+            'v': value,
+            'id': str(position['id']),
+            'r': int(position['r']),
+        }, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(
+            remove_query_param(self.request.build_absolute_uri(), self.page_query_param),
+            self.cursor_query_param, cursor,
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            ordering = f"{'-' if self.descending else ''}{self.field}"
+            if payload['o'] != ordering:
+                raise ValueError('cursor was issued for a different ordering')
+            value = payload['v']
+            if value is not None and isinstance(Task._fields[self.field], DateTimeField):
+                value = datetime.fromisoformat(value)
+            return {'v': value, 'id': ObjectId(payload['id']), 'r': bool(payload['r'])}
+        except (TypeError, KeyError, ValueError, UnicodeDecodeError, binascii.Error, InvalidId):
+            raise NotFound(self.invalid_cursor_message)
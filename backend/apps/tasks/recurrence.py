@@ -0,0 +1,144 @@
+import logging
+from datetime import datetime, timedelta
+
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, YEARLY, MO, TU, WE, TH, FR, rrule, rrulestr
+from django.conf import settings
+from pymongo.errors import BulkWriteError
+
+from apps.analytics.models import TaskRollup
+
+from .models import Task, title_tokens
+
+logger = logging.getLogger(__name__)
+
+SIMPLE_PATTERNS = {
+    'daily': {'freq': DAILY},
+    'weekdays': {'freq': DAILY, 'byweekday': (MO, TU, WE, TH, FR)},
+    'weekly': {'freq': WEEKLY},
+    'biweekly': {'freq': WEEKLY, 'interval': 2},
+    'monthly': {'freq': MONTHLY},
+    'yearly': {'freq': YEARLY},
+}
+
+# Fields copied from the recurring template onto each occurrence
+INHERITED_FIELDS = (
+    'title', 'description', 'category', 'priority', 'tags',
+    'estimated_duration', 'complexity_score',
+)
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Watermark of a series whose pattern cannot be parsed, so runs skip it until the pattern is edited
+PARKED = datetime(9999, 1, 1)
+
+
+def parse_pattern(pattern, dtstart):
+    """Parse a recurrence pattern into a dateutil rule starting at ``dtstart``.
+
+    Accepts the simple keywords in ``SIMPLE_PATTERNS`` as well as RRULE
+    strings such as ``FREQ=WEEKLY;BYDAY=MO,WE`` (with or without the
+    ``RRULE:`` prefix). Raises ``ValueError`` for anything else.
+    """
+    pattern = (pattern or '').strip()
+    if pattern.lower() in SIMPLE_PATTERNS:
+        return rrule(dtstart=dtstart, **SIMPLE_PATTERNS[pattern.lower()])
+    if pattern.upper().startswith(('RRULE:', 'FREQ=')):
+        rule = pattern if pattern.upper().startswith('RRULE:') else f'RRULE:{pattern}'
+        return rrulestr(rule, dtstart=dtstart)
+    raise ValueError(f'Unsupported recurrence pattern: {pattern!r}')
+
+
+def due_occurrences(template, now, horizon, max_occurrences):
+    """Occurrences of a raw template row after its watermark and up to ``horizon``, at most ``max_occurrences``.
+
+    Occurrences further in the past than ``RECURRENCE_BACKFILL_HOURS`` are
+    skipped, so a series created or resumed long after its start date does
+    not backfill a run of overdue copies. Raises ``ValueError`` for an
+    unsupported pattern.
+    """
+    dtstart = template.get('due_date') or template['created_at']
+    earliest = now - timedelta(hours=settings.RECURRENCE_BACKFILL_HOURS)
+    watermark = max(template.get('recurrence_watermark') or dtstart, earliest)
+    rule = parse_pattern(template.get('recurrence_pattern'), dtstart)
+    occurrences = []
+    for occurrence in rule.xafter(watermark, count=max_occurrences):
+        if occurrence > horizon:
+            break
+        occurrences.append(occurrence)
+    return occurrences
+
+
+def materialize_series(template, now, horizon, max_occurrences):
+    """Insert the ``due_occurrences`` of one raw template row.
+
+    Occurrences are unique per ``(recurrence_parent, due_date)``, so
+    re-running after a crash between the insert and the watermark update
+    only skips the duplicates. A series with an unsupported pattern is
+    parked, and warned about once rather than on every run. Returns the
+    number of tasks inserted.
+    """
+    template_id = template['_id']
+    try:
+        occurrences = due_occurrences(template, now, horizon, max_occurrences)
+    except ValueError as e:
+        logger.warning('Parking recurring task %s until its pattern is fixed: %s', template_id, e)
+        Task.objects(id=template_id).update_one(set__recurrence_watermark=PARKED)
+        return 0
+    if not occurrences:
+        # Nothing due in the window yet; park the series until the window reaches it
+        Task.objects(id=template_id).update_one(max__recurrence_watermark=horizon)
+        return 0
+
+    documents = []
+    for occurrence in occurrences:
+        task = Task(
+            user=template['user'],
+            due_date=occurrence,
+            recurrence_parent=template_id,
+            title_tokens=title_tokens(template.get('title')),
+            **{field: template[field] for field in INHERITED_FIELDS if field in template}
+        )
+        documents.append(task.to_mongo())
+
+    stamped_at = datetime.utcnow()
+    for document in documents:
+        document['created_at'] = document['updated_at'] = stamped_at
+    duplicates = set()
+    try:
+        Task._get_collection().insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if any(error['code'] != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        duplicates = {error['index'] for error in errors}
+    inserted = [document for position, document in enumerate(documents) if position not in duplicates]
+    TaskRollup.apply(template['user'], added=inserted)
+
+    Task.objects(id=template_id).update_one(max__recurrence_watermark=occurrences[-1])
+    return len(inserted)
+
+
+def materialize_recurring_tasks(now=None, window_days=None, max_occurrences=None):
+    """Materialize upcoming occurrences for every series behind the rolling window.
+
+    Only series whose watermark is before the window horizon are loaded, so
+    each run touches the series that actually need new instances.
+    """
+    now = now or datetime.utcnow()
+    window_days = window_days or settings.RECURRENCE_WINDOW_DAYS
+    max_occurrences = max_occurrences or settings.RECURRENCE_MAX_OCCURRENCES
+    horizon = now + timedelta(days=window_days)
+
+    templates = Task.objects(
+        is_recurring=True,
+        recurrence_parent=None,
+        __raw__={'$or': [
+            {'recurrence_watermark': None},
+            {'recurrence_watermark': {'$lt': horizon}},
+        ]},
+    ).only('user', 'due_date', 'created_at', 'recurrence_pattern', 'recurrence_watermark', *INHERITED_FIELDS).as_pymongo()
+
+    created = 0
+    for template in templates:
+        created += materialize_series(template, now, horizon, max_occurrences)
+    return created
@@ -1,6 +1,22 @@
+from datetime import datetime
+from bson import ObjectId
+from mongoengine.errors import ValidationError
+from pymongo.errors import BulkWriteError
 from rest_framework import serializers
+from .graph import DependencyGraph
+from .hooks import on_tasks_written
 from .models import Task
+from .recurrence import PARKED, parse_pattern
 from apps.authentication.models import User
+from apps.ai_services.classifier import CATEGORIES, LEARNED_KEY, learned_example
+from apps.ai_services.tasks import ENRICHABLE_FIELDS, enqueue_enrichment, enqueue_enrichment_many
+
+
+class ReferenceIdField(serializers.CharField):
+    """Represent a task reference by its id without dereferencing it"""
+    
+    def to_representation(self, value):
+        return str(getattr(value, 'pk', value))
 
 
 class TaskSerializer(serializers.Serializer):
@@ -24,24 +40,81 @@ class TaskSerializer(serializers.Serializer):
     
     # Additional fields
     tags = serializers.ListField(child=serializers.CharField(max_length=50), required=False, default=list)
-    dependencies = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    dependencies = serializers.ListField(child=ReferenceIdField(), required=False, default=list)
     attachments = serializers.ListField(child=serializers.CharField(), required=False, default=list)
     is_recurring = serializers.BooleanField(required=False, default=False)
     recurrence_pattern = serializers.CharField(max_length=100, required=False, allow_blank=True)
     
+    def validate_dependencies(self, value):
+        invalid = [task_id for task_id in value if not ObjectId.is_valid(task_id)]
+        if invalid:
+            raise serializers.ValidationError(f"Invalid task ids: {', '.join(invalid)}")
+        dependency_ids = [ObjectId(task_id) for task_id in value]
+        
+        request = self.context.get('request')
+        if request is None or not dependency_ids:
+            return dependency_ids
+        
+        # Shared through the context so a bulk request loads the graph once
+        graph = self.context.get('dependency_graph')
+        if graph is None:
+            graph = self.context['dependency_graph'] = DependencyGraph.for_user(request.user)
+        missing = [str(task_id) for task_id in dependency_ids if task_id not in graph.nodes]
+        if missing:
+            raise serializers.ValidationError(f"Unknown tasks: {', '.join(missing)}")
+        if self.instance is not None and graph.creates_cycle(self.instance.pk, dependency_ids):
+            raise serializers.ValidationError("These dependencies would create a cycle.")
+        return dependency_ids
+    
+    def validate_recurrence_pattern(self, value):
+        if value:
+            try:
+                parse_pattern(value, datetime.utcnow())
+            except ValueError as e:
+                raise serializers.ValidationError(str(e))
+        return value
+    
     def create(self, validated_data):
         user = self.context['request'].user
         task = Task(
             user=user,
             **validated_data
         )
+        # Only categories the user picked train the local classifier, not defaults
+        if 'category' in self.initial_data and task.category in CATEGORIES:
+            task.ai_metadata = {**task.ai_metadata, LEARNED_KEY: task.category}
         task.save()
+        on_tasks_written(user, after=[task.to_mongo()])
+        enqueue_enrichment(task, provided=self.initial_data)
         return task
     
     def update(self, instance, validated_data):
+        learned = learned_example(instance.title, instance.description, instance.ai_metadata)
+        content_changed = any(
+            field in validated_data and validated_data[field] != getattr(instance, field)
+            for field in ('title', 'description', 'due_date')
+        )
+        before = instance.to_mongo()
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        if 'recurrence_pattern' in validated_data and instance.recurrence_watermark == PARKED:
+            # A series parked for an unsupported pattern resumes once the pattern is fixed
+            instance.recurrence_watermark = None
+        # The learned example follows the task: a category the user picks
+        # replaces it, and text edits retrain it under the same category
+        if 'category' in validated_data:
+            category = instance.category if instance.category in CATEGORIES else None
+        else:
+            category = learned[2] if learned else None
+        metadata = {key: value for key, value in instance.ai_metadata.items() if key != LEARNED_KEY}
+        instance.ai_metadata = {**metadata, LEARNED_KEY: category} if category else metadata
         instance.save()
+        on_tasks_written(instance.user, before=[before], after=[instance.to_mongo()])
+        if content_changed:
+            # Re-estimate only what enrichment filled in before, never the user's own values
+            enriched = instance.ai_metadata.get('enriched_fields', [])
+            provided = set(self.initial_data) | (set(ENRICHABLE_FIELDS) - set(enriched))
+            enqueue_enrichment(instance, provided=provided)
         return instance
 
 
@@ -62,17 +135,153 @@ class TaskListSerializer(serializers.Serializer):
     complexity_score = serializers.IntegerField(read_only=True)
 
 
+def _to_iso(value):
+    # Matches DateTimeField output for the naive UTC datetimes MongoDB returns
+    return value.isoformat() + 'Z' if value.tzinfo is None else serializers.DateTimeField().to_representation(value)
+
+
+_FAST_CONVERTERS = {
+    serializers.CharField: str,
+    serializers.IntegerField: int,
+    serializers.BooleanField: bool,
+    serializers.DateTimeField: _to_iso,
+    serializers.ListField: list,
+}
+
+
+class TaskListFastSerializer:
+    """Serialize projected raw task dicts with the TaskListSerializer schema.
+
+    ``TaskListView`` reads listings with ``.only(...).as_pymongo()``, so rows
+    are plain dicts. The per-field converters are compiled once from
+    ``TaskListSerializer`` and ``is_overdue``/``days_until_due`` are derived
+    against a single timestamp per page instead of per row.
+    """
+    fields = tuple(
+        (name, _FAST_CONVERTERS[type(field)])
+        for name, field in TaskListSerializer._declared_fields.items()
+    )
+    projection = tuple(name for name, _ in fields if name in Task._fields)
+    
+    def __init__(self, instance=None, many=False, **kwargs):
+        self.instance = instance
+        self.many = many
+    
+    @property
+    def data(self):
+        now = datetime.utcnow()
+        if self.many:
+            return [self.to_representation(row, now) for row in self.instance]
+        return self.to_representation(self.instance, now)
+    
+    def to_representation(self, row, now):
+        due_date = row.get('due_date')
+        data = {}
+        for name, convert in self.fields:
+            if name == 'id':
+                value = row.get('_id')
+            elif name == 'is_overdue':
+                value = bool(due_date and row.get('status') != 'completed' and now > due_date)
+            elif name == 'days_until_due':
+                value = (due_date - now).days if due_date else None
+            else:
+                value = row.get(name)
+            data[name] = None if value is None else convert(value)
+        return data
+
+
 class BulkTaskSerializer(serializers.Serializer):
-    tasks = TaskSerializer(many=True)
+    """Validate a batch of tasks item by item and write them with insert_many.
+
+    Invalid items are reported instead of failing the whole batch, and valid
+    ones are inserted unordered in chunks so throughput scales with batch
+    size rather than with round trips.
+    """
+    tasks = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    
+    chunk_size = 1000
     
     def create(self, validated_data):
         user = self.context['request'].user
-        tasks_data = validated_data['tasks']
         created_tasks = []
+        errors = []
+        documents = []
+        
+        for index, item in enumerate(validated_data['tasks']):
+            item_serializer = TaskSerializer(data=item, context=self.context)
+            if not item_serializer.is_valid():
+                errors.append({'index': index, 'errors': item_serializer.errors})
+                continue
+            task = Task(user=user, **item_serializer.validated_data)
+            if 'category' in item and task.category in CATEGORIES:
+                task.ai_metadata = {**task.ai_metadata, LEARNED_KEY: task.category}
+            try:
+                task.validate()
+            except ValidationError as e:
+                errors.append({'index': index, 'errors': e.to_dict()})
+                continue
+            documents.append((index, task))
+        
+        collection = Task._get_collection()
+        for start in range(0, len(documents), self.chunk_size):
+            chunk = documents[start:start + self.chunk_size]
+            # Stamp each chunk as it is written, not when it was validated, so
+            # a sync running during a long import cannot skip past it
+            stamped_at = datetime.utcnow()
+            for _, task in chunk:
+                task.created_at = task.updated_at = stamped_at
+            # insert_many assigns _id on these dicts in place, even on failure
+            raw_documents = [task.to_mongo() for _, task in chunk]
+            failed = {}
+            try:
+                collection.insert_many(raw_documents, ordered=False)
+            except BulkWriteError as e:
+                failed = {error['index']: error.get('errmsg', 'write failed') for error in e.details.get('writeErrors', [])}
+            
+            for position, (index, task) in enumerate(chunk):
+                if position in failed:
+                    errors.append({'index': index, 'errors': {'non_field_errors': [failed[position]]}})
+                    continue
+                task.id = raw_documents[position]['_id']
+                task._created = False
+                created_tasks.append(task)
         
-        for task_data in tasks_data:
-            task = Task(user=user, **task_data)
-            task.save()
-            created_tasks.append(task)
+        on_tasks_written(user, after=[task.to_mongo() for task in created_tasks])
+        enqueue_enrichment_many([
+            (task, validated_data['tasks'][index]) for index, task in documents if task.id
+        ])
+        
+        errors.sort(key=lambda error: error['index'])
+        return {'tasks': created_tasks, 'errors': errors}
+
+
+class BulkTaskUpdateSerializer(serializers.Serializer):
+    """Validate a bulk update against a whitelist of updatable Task fields.
+
+    Values are coerced through the matching ``TaskSerializer`` fields so the
+    resulting ``$set`` can be applied with a single ``update_many``.
+    """
+    UPDATABLE_FIELDS = (
+        'title', 'description', 'category', 'priority', 'status', 'due_date',
+        'suggested_category', 'estimated_duration', 'complexity_score',
+        'tags', 'is_recurring', 'recurrence_pattern',
+    )
+    
+    task_ids = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+    update_data = serializers.DictField(allow_empty=False)
+    
+    def validate_task_ids(self, value):
+        invalid = [task_id for task_id in value if not ObjectId.is_valid(task_id)]
+        if invalid:
+            raise serializers.ValidationError(f"Invalid task ids: {', '.join(invalid)}")
+        return value
+    
+    def validate_update_data(self, value):
+        not_allowed = sorted(set(value) - set(self.UPDATABLE_FIELDS))
+        if not_allowed:
+            raise serializers.ValidationError(f"Fields cannot be bulk updated: {', '.join(not_allowed)}")
         
-        return {'tasks': created_tasks} 
\ No newline at end of file
+        field_serializer = TaskSerializer(data=value, partial=True)
+        if not field_serializer.is_valid():
+            raise serializers.ValidationError(field_serializer.errors)
+        return field_serializer.validated_data
@@ -0,0 +1,99 @@
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+
+from .models import Task, TaskTombstone
+from .serializers import TaskListFastSerializer
+
+MIN_OBJECT_ID = ObjectId('0' * 24)
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+class ExpiredSyncToken(ValueError):
+    pass
+
+
+def encode_token(updated_at, task_id):
+    millis = int((updated_at - datetime(1970, 1, 1)).total_seconds() * 1000)
+    return base64.urlsafe_b64encode(f'{millis}:{task_id}'.encode()).decode()
+
+
+def decode_token(token):
+    try:
+        millis, task_id = base64.urlsafe_b64decode(token.encode()).decode().split(':')
+        return datetime(1970, 1, 1) + timedelta(milliseconds=int(millis)), ObjectId(task_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error, InvalidId):
+        raise InvalidSyncToken('Invalid sync token')
+
+
+def sync_start(token, now):
+    """The ``(updated_at, _id)`` a sync resumes after; raises ``ExpiredSyncToken`` past the tombstone TTL"""
+    if not token:
+        return datetime(1970, 1, 1), MIN_OBJECT_ID
+    since, since_id = decode_token(token)
+    if since < now - timedelta(days=settings.SYNC_TOMBSTONE_TTL_DAYS):
+        raise ExpiredSyncToken('Sync token expired, full resync required')
+    return since, since_id
+
+
+def sync_end(rows, has_more, since, since_id, now):
+    """The ``(updated_at, _id)`` the next token resumes after, given this page's rows"""
+    if has_more:
+        return rows[-1]['updated_at'], rows[-1]['_id']
+    until = now - timedelta(seconds=settings.SYNC_SAFETY_LAG_SECONDS)
+    # Never move the token backwards, even if the last sync ran within the lag
+    if until < since:
+        return since, since_id
+    return until, MIN_OBJECT_ID
+
+
+def changes_since(user, token=None, page_size=None):
+    """Return the tasks changed and deleted since ``token``.
+
+    Tasks are walked in ``(updated_at, _id)`` order on the
+    ``(user, updated_at, _id)`` index, so a large backlog is returned over
+    several calls with ``has_more`` set. Deleted tasks come from tombstones
+    in the same time range.
+    
+    ``updated_at`` is stamped by the writing worker, so a write stamped
+    shortly before "now" may not be visible yet, and worker clocks may
+    differ slightly. A caught-up token therefore never points past
+    ``SYNC_SAFETY_LAG_SECONDS`` ago, and that overlap is sent again on the
+    next sync.
+    """
+    page_size = page_size or settings.SYNC_PAGE_SIZE
+    now = datetime.utcnow()
+    since, since_id = sync_start(token, now)
+
+    rows = list(
+        Task.objects(user=user)
+        .filter(__raw__={'$or': [
+            {'updated_at': {'$gt': since}},
+            {'updated_at': since, '_id': {'$gt': since_id}},
+        ]})
+        .order_by('+updated_at', '+id')
+        .only(*TaskListFastSerializer.projection)
+        .limit(page_size + 1)
+        .as_pymongo()
+    )
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    until, until_id = sync_end(rows, has_more, since, since_id, now)
+
+    deleted = TaskTombstone.objects(
+        user=user, deleted_at__gt=since, deleted_at__lte=until,
+    ).scalar('task_id')
+
+    return {
+        'tasks': TaskListFastSerializer(rows, many=True).data,
+        'deleted': [str(task_id) for task_id in deleted],
+        'next_token': encode_token(until, until_id),
+        'has_more': has_more,
+    }
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .recurrence import materialize_recurring_tasks
+
+
+@shared_task(ignore_result=True)
+def materialize_recurring_tasks_job():
+    """Hourly beat job keeping recurring series materialized through the rolling window"""
+    return materialize_recurring_tasks()
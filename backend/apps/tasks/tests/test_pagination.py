@@ -0,0 +1,100 @@
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from django.test import SimpleTestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.tasks.pagination import TaskPagination
+
+factory = APIRequestFactory()
+
+
+def paginator(field='created_at', descending=True, path='/api/tasks/?cursor='):
+    pagination = TaskPagination()
+    pagination.field = field
+    pagination.descending = descending
+    pagination.request = Request(factory.get(path))
+    return pagination
+
+
+def cursor_request(url):
+    return Request(factory.get(url))
+
+
+class SeekQueryTests(SimpleTestCase):
+    last_id = ObjectId('0123456789abcdef01234567')
+
+    def test_descending_includes_smaller_values_ties_and_trailing_nulls(self):
+        query = paginator(descending=True).seek_query(datetime(2024, 3, 1), self.last_id, True)
+        self.assertEqual(query, {'$or': [
+            {'created_at': {'$lt': datetime(2024, 3, 1)}},
+            {'created_at': datetime(2024, 3, 1), '_id': {'$lt': self.last_id}},
+            {'created_at': None},
+        ]})
+
+    def test_ascending_includes_larger_values_and_ties(self):
+        query = paginator(field='priority', descending=False).seek_query(3, self.last_id, False)
+        self.assertEqual(query, {'$or': [
+            {'priority': {'$gt': 3}},
+            {'priority': 3, '_id': {'$gt': self.last_id}},
+        ]})
+
+    def test_null_value_descending_stays_within_the_nulls(self):
+        query = paginator(field='due_date').seek_query(None, self.last_id, True)
+        self.assertEqual(query, {'due_date': None, '_id': {'$lt': self.last_id}})
+
+    def test_null_value_ascending_moves_on_to_non_null_values(self):
+        query = paginator(field='due_date', descending=False).seek_query(None, self.last_id, False)
+        self.assertEqual(query, {'$or': [
+            {'due_date': None, '_id': {'$gt': self.last_id}},
+            {'due_date': {'$ne': None}},
+        ]})
+
+
+class CursorRoundTripTests(SimpleTestCase):
+    task_id = ObjectId('0123456789abcdef01234567')
+
+    def round_trip(self, pagination, position):
+        url = pagination.encode_cursor(position)
+        return pagination.decode_cursor(cursor_request(url))
+
+    def test_datetime_value_round_trips(self):
+        position = {'v': datetime(2024, 3, 1, 12, 30, 15, 250000), 'id': self.task_id, 'r': False}
+        self.assertEqual(self.round_trip(paginator(), position), position)
+
+    def test_integer_string_and_null_values_round_trip(self):
+        for field, value in (('priority', 4), ('title', 'Pay rent'), ('due_date', None)):
+            with self.subTest(field=field):
+                position = {'v': value, 'id': self.task_id, 'r': True}
+                self.assertEqual(self.round_trip(paginator(field=field, descending=False), position), position)
+
+    def test_encoded_url_replaces_the_page_parameter(self):
+        pagination = paginator(path='/api/tasks/?page=3&status=pending')
+        url = pagination.encode_cursor({'v': 2, 'id': self.task_id, 'r': False})
+        self.assertNotIn('page=', url)
+        self.assertIn('status=pending', url)
+        self.assertIn('cursor=', url)
+
+    def test_no_position_encodes_to_none(self):
+        self.assertIsNone(paginator().encode_cursor(None))
+
+    def test_empty_cursor_starts_from_the_first_page(self):
+        self.assertIsNone(paginator().decode_cursor(cursor_request('/api/tasks/?cursor=')))
+
+    def test_cursor_for_another_ordering_is_rejected(self):
+        url = paginator(field='priority').encode_cursor({'v': 2, 'id': self.task_id, 'r': False})
+        with self.assertRaises(NotFound):
+            paginator(field='created_at').decode_cursor(cursor_request(url))
+
+    def test_malformed_cursors_are_rejected(self):
+        tampered = base64.urlsafe_b64encode(json.dumps(
+            {'o': '-created_at', 'v': None, 'id': 'not-an-id', 'r': 0}
+        ).encode()).decode()
+        for cursor in ('garbage', base64.urlsafe_b64encode(b'{}').decode(), tampered):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(NotFound):
+                    paginator().decode_cursor(cursor_request(f'/api/tasks/?cursor={cursor}'))
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.tasks.recurrence import PARKED, due_occurrences, materialize_series, parse_pattern
+
+NOW = datetime(2024, 3, 4, 8, 0)  # a Monday
+HORIZON = NOW + timedelta(days=14)
+
+
+def template(pattern, due_date, watermark=None):
+    return {'recurrence_pattern': pattern, 'due_date': due_date, 'created_at': due_date, 'recurrence_watermark': watermark}
+
+
+class ParsePatternTests(SimpleTestCase):
+    def test_keywords_and_rrules(self):
+        start = datetime(2024, 3, 1, 9, 0)  # a Friday
+        self.assertEqual(parse_pattern('daily', start)[1], datetime(2024, 3, 2, 9, 0))
+        self.assertEqual(parse_pattern('Weekdays', start)[1], datetime(2024, 3, 4, 9, 0))
+        self.assertEqual(parse_pattern('biweekly', start)[1], datetime(2024, 3, 15, 9, 0))
+        self.assertEqual(parse_pattern('FREQ=WEEKLY;BYDAY=MO', start)[0], datetime(2024, 3, 4, 9, 0))
+        self.assertEqual(parse_pattern('RRULE:FREQ=MONTHLY', start)[1], datetime(2024, 4, 1, 9, 0))
+
+    def test_unsupported_pattern_raises(self):
+        for pattern in ('every other day', '', None):
+            with self.subTest(pattern=pattern):
+                with self.assertRaises(ValueError):
+                    parse_pattern(pattern, NOW)
+
+
+@override_settings(RECURRENCE_BACKFILL_HOURS=24)
+class DueOccurrencesTests(SimpleTestCase):
+    def test_daily_series_fills_the_window_after_its_start(self):
+        occurrences = due_occurrences(template('daily', datetime(2024, 3, 4, 9, 0)), NOW, HORIZON, 100)
+        self.assertEqual(occurrences[0], datetime(2024, 3, 5, 9, 0))
+        # The horizon is 08:00 on the 18th, before that day's occurrence
+        self.assertEqual(occurrences[-1], datetime(2024, 3, 17, 9, 0))
+        self.assertEqual(len(occurrences), 13)
+
+    def test_resumes_after_the_watermark(self):
+        series = template('daily', datetime(2024, 3, 4, 9, 0), watermark=datetime(2024, 3, 10, 9, 0))
+        occurrences = due_occurrences(series, NOW, HORIZON, 100)
+        self.assertEqual(occurrences[0], datetime(2024, 3, 11, 9, 0))
+        self.assertEqual(len(occurrences), 7)
+
+    def test_old_series_does_not_backfill_beyond_the_allowance(self):
+        occurrences = due_occurrences(template('daily', datetime(2023, 1, 1, 9, 0)), NOW, HORIZON, 100)
+        # Only yesterday's occurrence is within RECURRENCE_BACKFILL_HOURS of now
+        self.assertEqual(occurrences[0], datetime(2024, 3, 3, 9, 0))
+        self.assertEqual(len(occurrences), 15)
+
+    @override_settings(RECURRENCE_BACKFILL_HOURS=0)
+    def test_no_backfill_allowance_starts_from_now(self):
+        occurrences = due_occurrences(template('daily', datetime(2023, 1, 1, 9, 0)), NOW, HORIZON, 100)
+        self.assertEqual(occurrences[0], datetime(2024, 3, 4, 9, 0))
+
+    def test_capped_at_max_occurrences(self):
+        occurrences = due_occurrences(template('daily', datetime(2024, 3, 4, 9, 0)), NOW, HORIZON, 5)
+        self.assertEqual(occurrences[-1], datetime(2024, 3, 9, 9, 0))
+        self.assertEqual(len(occurrences), 5)
+
+    def test_nothing_due_before_the_horizon(self):
+        series = template('monthly', datetime(2024, 3, 1, 9, 0))
+        self.assertEqual(due_occurrences(series, NOW, HORIZON, 100), [])
+
+    def test_horizon_is_inclusive(self):
+        series = template('weekly', datetime(2024, 3, 4, 8, 0))
+        self.assertEqual(due_occurrences(series, NOW, HORIZON, 100), [datetime(2024, 3, 11, 8, 0), HORIZON])
+
+
+class MaterializeSeriesTests(SimpleTestCase):
+    def test_unsupported_pattern_parks_the_series(self):
+        series = {**template('every other day', datetime(2024, 3, 4, 9, 0)), '_id': 'series'}
+        with mock.patch('apps.tasks.recurrence.Task') as task, self.assertLogs('apps.tasks.recurrence', 'WARNING'):
+            self.assertEqual(materialize_series(series, NOW, HORIZON, 100), 0)
+        task.objects.assert_called_once_with(id='series')
+        task.objects.return_value.update_one.assert_called_once_with(set__recurrence_watermark=PARKED)
+        self.assertGreater(PARKED, HORIZON)  # past any horizon, so later runs no longer load it
@@ -0,0 +1,63 @@
+import base64
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.test import SimpleTestCase, override_settings
+
+from apps.tasks.sync import (
+    MIN_OBJECT_ID, ExpiredSyncToken, InvalidSyncToken, decode_token, encode_token, sync_end, sync_start,
+)
+
+NOW = datetime(2024, 3, 4, 12, 0, 0)
+TASK_ID = ObjectId('0123456789abcdef01234567')
+
+
+class SyncTokenTests(SimpleTestCase):
+    def test_round_trip(self):
+        updated_at = datetime(2024, 3, 4, 11, 59, 30, 123000)
+        self.assertEqual(decode_token(encode_token(updated_at, TASK_ID)), (updated_at, TASK_ID))
+
+    def test_truncated_to_milliseconds_like_mongodb(self):
+        since, _ = decode_token(encode_token(datetime(2024, 3, 4, 11, 59, 30, 123456), TASK_ID))
+        self.assertEqual(since, datetime(2024, 3, 4, 11, 59, 30, 123000))
+
+    def test_invalid_tokens(self):
+        for token in ('garbage', base64.urlsafe_b64encode(b'123').decode(),
+                      base64.urlsafe_b64encode(b'abc:0123456789abcdef01234567').decode(),
+                      base64.urlsafe_b64encode(b'123:not-an-id').decode()):
+            with self.subTest(token=token):
+                with self.assertRaises(InvalidSyncToken):
+                    decode_token(token)
+
+
+@override_settings(SYNC_TOMBSTONE_TTL_DAYS=30)
+class SyncStartTests(SimpleTestCase):
+    def test_no_token_starts_from_the_beginning(self):
+        self.assertEqual(sync_start(None, NOW), (datetime(1970, 1, 1), MIN_OBJECT_ID))
+
+    def test_token_resumes_where_it_points(self):
+        since = NOW - timedelta(days=29)
+        self.assertEqual(sync_start(encode_token(since, TASK_ID), NOW), (since, TASK_ID))
+
+    def test_token_older_than_the_tombstones_expires(self):
+        with self.assertRaises(ExpiredSyncToken):
+            sync_start(encode_token(NOW - timedelta(days=31), TASK_ID), NOW)
+
+
+@override_settings(SYNC_SAFETY_LAG_SECONDS=30)
+class SyncEndTests(SimpleTestCase):
+    def test_more_pages_resume_after_the_last_row(self):
+        rows = [{'updated_at': NOW - timedelta(minutes=5), '_id': TASK_ID}]
+        self.assertEqual(sync_end(rows, True, datetime(1970, 1, 1), MIN_OBJECT_ID, NOW), (rows[0]['updated_at'], TASK_ID))
+
+    def test_caught_up_token_stays_behind_the_safety_lag(self):
+        since = NOW - timedelta(hours=1)
+        rows = [{'updated_at': NOW - timedelta(seconds=1), '_id': TASK_ID}]
+        until, until_id = sync_end(rows, False, since, TASK_ID, NOW)
+        self.assertEqual((until, until_id), (NOW - timedelta(seconds=30), MIN_OBJECT_ID))
+        # So the write stamped within the lag is sent again next time
+        self.assertLess(until, rows[0]['updated_at'])
+
+    def test_caught_up_token_never_moves_backwards(self):
+        since = NOW - timedelta(seconds=10)
+        self.assertEqual(sync_end([], False, since, TASK_ID, NOW), (since, TASK_ID))
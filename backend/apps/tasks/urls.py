@@ -1,14 +1,19 @@
 from django.urls import path
 from .views import (
     TaskListView, TaskDetailView, bulk_create_tasks, 
-    bulk_update_tasks, bulk_delete_tasks, task_statistics
+    bulk_update_tasks, bulk_delete_tasks, task_statistics,
+    dependency_order, dependency_status, dependency_critical_path, task_sync
 )
 
 urlpatterns = [
     path('', TaskListView.as_view(), name='task-list'),
-    path('<str:id>/', TaskDetailView.as_view(), name='task-detail'),
     path('bulk-create/', bulk_create_tasks, name='bulk-create-tasks'),
     path('bulk-update/', bulk_update_tasks, name='bulk-update-tasks'),
     path('bulk-delete/', bulk_delete_tasks, name='bulk-delete-tasks'),
     path('statistics/', task_statistics, name='task-statistics'),
+    path('sync/', task_sync, name='task-sync'),
+    path('dependencies/order/', dependency_order, name='dependency-order'),
+    path('dependencies/status/', dependency_status, name='dependency-status'),
+    path('dependencies/critical-path/', dependency_critical_path, name='dependency-critical-path'),
+    path('<str:id>/', TaskDetailView.as_view(), name='task-detail'),
 ] 
\ No newline at end of file
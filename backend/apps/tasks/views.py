@@ -2,28 +2,52 @@ from rest_framework import status, generics, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django_filters.rest_framework import DjangoFilterBackend
-from .models import Task
-from .serializers import TaskSerializer, TaskListSerializer, BulkTaskSerializer
+from datetime import datetime
+from .etags import etag_matches, set_etag, task_etag, task_list_etag
+from .filters import TaskFilterBackend, TaskSearchFilter
+from .graph import DependencyGraph
+from .hooks import on_tasks_written
+from .models import Task, title_tokens
+from .pagination import TaskPagination
+from .serializers import (
+    TaskSerializer, TaskListSerializer, TaskListFastSerializer,
+    BulkTaskSerializer, BulkTaskUpdateSerializer
+)
+from .sync import changes_since, ExpiredSyncToken, InvalidSyncToken
+from apps.ai_services.classifier import CATEGORIES, LEARNED_KEY
+from apps.analytics.models import ROLLUP_FIELDS
 
 
 class TaskListView(generics.ListCreateAPIView):
     """List and create tasks"""
     permission_classes = [IsAuthenticated]
     serializer_class = TaskSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [TaskFilterBackend, filters.OrderingFilter, TaskSearchFilter]
     filterset_fields = ['status', 'category', 'priority']
     search_fields = ['title', 'description', 'tags']
     ordering_fields = ['created_at', 'due_date', 'priority', 'title']
     ordering = ['-created_at']
+    pagination_class = TaskPagination
     
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user)
+        queryset = Task.objects.filter(user=self.request.user)
+        if self.request.method == 'GET':
+            # Listings only need the projected fields, read as raw dicts
+            queryset = queryset.only(*TaskListFastSerializer.projection).as_pymongo()
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
-            return TaskListSerializer
+            if getattr(self, 'swagger_fake_view', False):
+                return TaskListSerializer
+            return TaskListFastSerializer
         return TaskSerializer
+    
+    def list(self, request, *args, **kwargs):
+        etag = task_list_etag(request)
+        if etag_matches(request, etag):
+            return set_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+        return set_etag(super().list(request, *args, **kwargs), etag)
 
 
 class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -34,6 +58,17 @@ class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         return Task.objects.filter(user=self.request.user)
+    
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = task_etag(instance)
+        if etag_matches(request, etag):
+            return set_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+        return set_etag(Response(self.get_serializer(instance).data), etag)
+    
+    def perform_destroy(self, instance):
+        instance.delete()
+        on_tasks_written(self.request.user, before=[instance.to_mongo()])
 
 
 @api_view(['POST'])
@@ -43,35 +78,59 @@ def bulk_create_tasks(request):
     serializer = BulkTaskSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         result = serializer.save()
+        created_count = len(result['tasks'])
         return Response({
-            'message': f'{len(result["tasks"])} tasks created successfully',
-            'tasks': TaskSerializer(result['tasks'], many=True).data
-        }, status=status.HTTP_201_CREATED)
+            'message': f'{created_count} tasks created successfully',
+            'created_count': created_count,
+            'failed_count': len(result['errors']),
+            'tasks': TaskSerializer(result['tasks'], many=True).data,
+            'errors': result['errors'],
+        }, status=status.HTTP_201_CREATED if created_count else status.HTTP_400_BAD_REQUEST)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def bulk_update_tasks(request):
-    """Bulk update tasks"""
-    task_ids = request.data.get('task_ids', [])
-    update_data = request.data.get('update_data', {})
+    """Bulk update tasks with a single update_many"""
+    serializer = BulkTaskUpdateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    if not task_ids:
-        return Response({'error': 'task_ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+    task_ids = serializer.validated_data['task_ids']
+    update_data = serializer.validated_data['update_data']
     
     tasks = Task.objects.filter(user=request.user, id__in=task_ids)
-    updated_count = 0
+    now = datetime.utcnow()
+    completing = update_data.get('status') == 'completed'
+    retraining = bool({'title', 'description', 'category'} & set(update_data))
+    rows = []
+    if completing or retraining or set(update_data) & set(ROLLUP_FIELDS):
+        rows = list(tasks.only('title', 'description', 'ai_metadata', *ROLLUP_FIELDS).as_pymongo())
     
-    for task in tasks:
-        for field, value in update_data.items():
-            if hasattr(task, field):
-                setattr(task, field, value)
-        task.save()
-        updated_count += 1
+    updates = {f'set__{field}': value for field, value in update_data.items()}
+    if 'title' in update_data:
+        updates['set__title_tokens'] = title_tokens(update_data['title'])
+    after = [{**row, **update_data, 'updated_at': now} for row in rows]
+    if 'category' in update_data:
+        # A category the user picks trains the classifier, as for a single update
+        category = update_data['category'] if update_data['category'] in CATEGORIES else None
+        if category:
+            updates['set__ai_metadata__learned_category'] = category
+        else:
+            updates['unset__ai_metadata__learned_category'] = True
+        after = [{**row, 'ai_metadata': {**(row.get('ai_metadata') or {}), LEARNED_KEY: category}} for row in after]
+    result = tasks.update(
+        set__updated_at=now,
+        full_result=True,
+        **updates
+    )
+    on_tasks_written(request.user, before=rows, after=after)
     
     return Response({
-        'message': f'{updated_count} tasks updated successfully'
+        'message': f'{result.modified_count} tasks updated successfully',
+        'matched_count': result.matched_count,
+        'modified_count': result.modified_count,
     }, status=status.HTTP_200_OK)
 
 
@@ -85,8 +144,9 @@ def bulk_delete_tasks(request):
         return Response({'error': 'task_ids is required'}, status=status.HTTP_400_BAD_REQUEST)
     
     tasks = Task.objects.filter(user=request.user, id__in=task_ids)
-    deleted_count = tasks.count()
-    tasks.delete()
+    rows = list(tasks.only('id', 'title', 'description', 'ai_metadata', *ROLLUP_FIELDS).as_pymongo())
+    deleted_count = tasks.delete()
+    on_tasks_written(request.user, before=rows)
     
     return Response({
         'message': f'{deleted_count} tasks deleted successfully'
@@ -97,29 +157,40 @@ def bulk_delete_tasks(request):
 @permission_classes([IsAuthenticated])
 def task_statistics(request):
     """Get task statistics for the user"""
-    user_tasks = Task.objects.filter(user=request.user)
+    # One $facet pass over the (user, status) index instead of a count()
+    # per status plus three full scans hydrating every Task document.
+    pipeline = [
+        {'$facet': {
+            'status': [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}],
+            'category': [{'$group': {'_id': '$category', 'count': {'$sum': 1}}}],
+            'priority': [{'$group': {'_id': '$priority', 'count': {'$sum': 1}}}],
+            'overdue': [
+                {'$match': {
+                    'status': {'$ne': 'completed'},
+                    'due_date': {'$ne': None, '$lt': datetime.utcnow()},
+                }},
+                {'$count': 'count'},
+            ],
+        }},
+    ]
+    facets = next(Task.objects.filter(user=request.user).order_by().aggregate(pipeline), {})
     
-    total_tasks = user_tasks.count()
-    completed_tasks = user_tasks.filter(status='completed').count()
-    pending_tasks = user_tasks.filter(status='pending').count()
-    in_progress_tasks = user_tasks.filter(status='in_progress').count()
-    overdue_tasks = sum(1 for task in user_tasks if task.is_overdue)
+    status_counts = {row['_id']: row['count'] for row in facets.get('status', [])}
+    total_tasks = sum(status_counts.values())
+    completed_tasks = status_counts.get('completed', 0)
+    pending_tasks = status_counts.get('pending', 0)
+    in_progress_tasks = status_counts.get('in_progress', 0)
+    overdue = facets.get('overdue', [])
+    overdue_tasks = overdue[0]['count'] if overdue else 0
     
     # Category breakdown
     categories = {}
-    for task in user_tasks:
-        category = task.category or 'uncategorized'
-        if category not in categories:
-            categories[category] = 0
-        categories[category] += 1
+    for row in facets.get('category', []):
+        category = row['_id'] or 'uncategorized'
+        categories[category] = categories.get(category, 0) + row['count']
     
     # Priority breakdown
-    priorities = {}
-    for task in user_tasks:
-        priority = task.priority
-        if priority not in priorities:
-            priorities[priority] = 0
-        priorities[priority] += 1
+    priorities = {row['_id']: row['count'] for row in facets.get('priority', [])}
     
     return Response({
         'total_tasks': total_tasks,
@@ -130,4 +201,57 @@ def task_statistics(request):
         'completion_rate': (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0,
         'categories': categories,
         'priorities': priorities,
-    }) 
\ No newline at end of file
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dependency_order(request):
+    """Get the user's tasks in dependency (topological) order"""
+    graph = DependencyGraph.for_user(request.user)
+    order, cyclic = graph.topological_order()
+    
+    return Response({
+        'order': graph.describe(order),
+        'cyclic': graph.describe(cyclic),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dependency_status(request):
+    """Get open tasks split into blocked and unblocked by their dependencies"""
+    graph = DependencyGraph.for_user(request.user)
+    blocked, unblocked = graph.blocked_and_unblocked()
+    
+    return Response({
+        'blocked': graph.describe(blocked),
+        'unblocked': graph.describe(unblocked),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dependency_critical_path(request):
+    """Get the longest chain of open dependent tasks by estimated duration"""
+    graph = DependencyGraph.for_user(request.user)
+    path, total_duration = graph.critical_path()
+    
+    return Response({
+        'critical_path': graph.describe(path),
+        'total_duration': total_duration,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def task_sync(request):
+    """Get the tasks changed and deleted since a sync token"""
+    try:
+        changes = changes_since(request.user, request.query_params.get('since'))
+    except InvalidSyncToken as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ExpiredSyncToken as e:
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+    
+    return Response(changes)
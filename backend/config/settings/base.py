@@ -165,6 +165,31 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Caches
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared AI result cache; Redis should run with maxmemory-policy volatile-lru
+    'ai': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+        'KEY_PREFIX': 'smart_todolist',
+        'OPTIONS': {
+            'socket_connect_timeout': 0.2,
+            'socket_timeout': 0.2,
+        },
+    },
+    # In-process LRU fallback while Redis is unreachable
+    'ai_local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ai-local',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
 # Celery settings
 CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
@@ -172,9 +197,81 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Fail fast instead of blocking a request when the broker is unreachable
+CELERY_BROKER_CONNECTION_TIMEOUT = 1
+# Run by the celery-beat service
+CELERY_BEAT_SCHEDULE = {
+    'materialize-recurring-tasks': {
+        'task': 'apps.tasks.tasks.materialize_recurring_tasks_job',
+        'schedule': 60 * 60,
+    },
+}
+
+# Recurring tasks: how far ahead occurrences are materialized, and the cap per series per run
+RECURRENCE_WINDOW_DAYS = int(os.environ.get('RECURRENCE_WINDOW_DAYS', 14))
+RECURRENCE_MAX_OCCURRENCES = int(os.environ.get('RECURRENCE_MAX_OCCURRENCES', 100))
+# Occurrences due at most this long ago are still created (covers missed scheduler runs)
+RECURRENCE_BACKFILL_HOURS = int(os.environ.get('RECURRENCE_BACKFILL_HOURS', 24))
+
+# Delta sync: tombstone retention (older sync tokens require a full resync) and page size
+SYNC_TOMBSTONE_TTL_DAYS = int(os.environ.get('SYNC_TOMBSTONE_TTL_DAYS', 30))
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+# Caught-up sync tokens stay this far behind now, so writes still in flight or
+# stamped by a worker with a slightly different clock are not skipped
+SYNC_SAFETY_LAG_SECONDS = int(os.environ.get('SYNC_SAFETY_LAG_SECONDS', 30))
 
 # AI Services
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+# Alternative OpenAI-compatible endpoint, e.g. the local fake server for load tests
+# (manage.py fake_llm): http://127.0.0.1:8100/v1
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL') or None
+# Shared OpenAI client: connection pool, per-method latency budgets (seconds),
+# retries with jittered backoff, and the circuit breaker in front of them
+AI_HTTP_MAX_CONNECTIONS = int(os.environ.get('AI_HTTP_MAX_CONNECTIONS', 20))
+AI_DEFAULT_TIMEOUT = 10.0
+AI_LATENCY_BUDGETS = {
+    'categorize_task': 4.0,
+    'suggest_priority': 4.0,
+    'estimate_duration': 4.0,
+    'parse_natural_language': 8.0,
+    'analyze_task': 8.0,
+    'categorize_batch': 20.0,
+}
+AI_MAX_RETRIES = 2
+AI_RETRY_BASE_DELAY = 0.25
+AI_CIRCUIT_FAILURE_THRESHOLD = 5
+AI_CIRCUIT_RESET_TIMEOUT = 30
+AI_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', 7 * 24 * 60 * 60))
+AI_CACHE_REDIS_RETRY_SECONDS = 30
+# Local categorization: answer without the LLM at or above this probability
+AI_CLASSIFIER_CONFIDENCE = float(os.environ.get('AI_CLASSIFIER_CONFIDENCE', 0.8))
+AI_CLASSIFIER_PRIOR_WEIGHT = 0.1  # weight of the global model next to a user's own history
+AI_CLASSIFIER_MIN_DOCUMENTS = 20
+AI_CLASSIFIER_PRIOR_SHARDS = 8  # global prior documents per category, to spread its writes
+# Natural-language parsing: answer from the local grammar at or above this confidence (0-100)
+AI_NLP_CONFIDENCE = int(os.environ.get('AI_NLP_CONFIDENCE', 60))
+# Batch categorization: tasks per prompt, concurrent requests, and items per call
+AI_BATCH_PROMPT_SIZE = 25
+AI_BATCH_CONCURRENCY = int(os.environ.get('AI_BATCH_CONCURRENCY', 8))
+AI_BATCH_MAX_ITEMS = 500
+# USD per 1K tokens by model, for the cost estimate on the AI metrics endpoint
+AI_TOKEN_PRICES = {
+    'gpt-3.5-turbo': {'prompt': 0.0005, 'completion': 0.0015},
+}
+# Lets a Prometheus scraper read the AI metrics with an X-Metrics-Token header instead of a staff login
+AI_METRICS_TOKEN = os.environ.get('AI_METRICS_TOKEN', '')
+# Background enrichment of saved tasks: on/off, retries, and how long an enqueued version is deduplicated
+AI_ENRICHMENT_ENABLED = os.environ.get('AI_ENRICHMENT_ENABLED', 'True').lower() == 'true'
+AI_ENRICHMENT_MAX_RETRIES = 5
+AI_ENRICHMENT_DEDUPE_TTL = 60 * 60 * 24
+AI_ENRICHMENT_BATCH_SIZE = 100  # tasks per job message when a bulk write enqueues many
+
+# Schedule optimizer: default working hours and days (Monday=0), in each user's own time
+# zone, and how many hours earlier each priority level makes a task's deadline count
+SCHEDULE_WORK_START = os.environ.get('SCHEDULE_WORK_START', '09:00')
+SCHEDULE_WORK_END = os.environ.get('SCHEDULE_WORK_END', '17:00')
+SCHEDULE_WORK_DAYS = [0, 1, 2, 3, 4]
+SCHEDULE_PRIORITY_WEIGHT_HOURS = 24
 
 # AWS S3 settings (optional)
 AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID', '')